@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ApiConfig(AppConfig):
     name = "api"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        if settings.PDF_PREWARM:
+            from .rendering import rendering_resources
+            rendering_resources.load()
@@ -0,0 +1,334 @@
+import base64
+import time
+import tracemalloc
+from io import BytesIO
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart, Tags, User
+from recipes.seed import SEED_PASSWORD
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import Follow
+
+# Число SQL-запросов на замер, включая поиск токена и COUNT(*)
+# пагинации (на больших выборках он берется из кэша). Поиск
+# ингредиентов всегда делает один запрос: в PostgreSQL - поиск по
+# индексу pg_trgm, с индексом в памяти - выборку найденных id.
+QUERY_BUDGETS = {
+    'tags-list': 0,
+    'tags-detail': 2,
+    'ingredients-search': 1,
+    'ingredients-search-letter': 2,
+    'ingredients-search-word': 2,
+    'ingredients-detail': 1,
+    'recipes-list-anon': 0,
+    'recipes-list': 6,
+    'recipes-list-tags': 6,
+    'recipes-list-author': 6,
+    'recipes-list-favorited': 6,
+    'recipes-list-cart': 6,
+    'recipes-list-cursor': 5,
+    'recipes-detail': 6,
+    'recipes-create': 17,
+    'recipes-update': 9,
+    'recipes-delete': 12,
+    'favorite-add': 7,
+    'favorite-remove': 9,
+    'favorite-bulk': 6,
+    'cart-add': 4,
+    'cart-remove': 5,
+    'cart-bulk': 5,
+    'download-txt': 3,
+    'download-csv': 3,
+    'download-pdf': 3,
+    'subscribe': 6,
+    'unsubscribe': 8,
+    'subscribe-bulk': 6,
+    'subscriptions': 4,
+    'users-list': 2,
+    'users-detail': 2,
+    'users-me': 1,
+    'users-create': 5,
+    'users-set-password': 2,
+    'token-login': 3,
+    'token-logout': 7,
+}
+
+
+def image_data_uri():
+    buffer = BytesIO()
+    Image.new('RGB', (600, 400), '#E26C2D').save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+class Case:
+    """Один замер: запрос к маршруту API.
+
+    setup вызывается перед каждым запросом и может вернуть словарь
+    параметров для path и заголовков HTTP_*; teardown возвращает данные
+    в исходное состояние. Ни то, ни другое в замер не входит.
+    """
+
+    def __init__(self, name, method, path, data=None, auth=True,
+                 status=200, setup=None, teardown=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.data = data
+        self.auth = auth
+        self.status = status
+        self.queries = QUERY_BUDGETS.get(name)
+        self.setup = setup
+        self.teardown = teardown
+
+
+class Benchmark:
+    """Прогон набора Case на подготовленных данных"""
+
+    def __init__(self, user_ids, iterations=20):
+        self.iterations = iterations
+        self.user = User.objects.get(pk=user_ids[0])
+        self.token = Token.objects.get_or_create(user=self.user)[0]
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.anon = APIClient()
+
+        self.recipe = Recipe.objects.exclude(
+            author=self.user
+        ).exclude(
+            favorite_recipe__user=self.user
+        ).exclude(recipe_in_cart__user=self.user).order_by('pk').first()
+        self.own_recipe = Recipe.objects.create(
+            author=self.user, name='Свой рецепт', text='Описание',
+            cooking_time=10, image='recipes/seed.png',
+        )
+        self.own_recipe.tags.set(Tags.objects.all()[:1])
+        self.author = User.objects.exclude(pk=self.user.pk).exclude(
+            follower__user=self.user
+        ).filter(recipes_count__gt=0).order_by('pk').first()
+        self.bulk_recipes = list(Recipe.objects.exclude(
+            favorite_recipe__user=self.user
+        ).exclude(
+            recipe_in_cart__user=self.user
+        ).order_by('-pk').values_list('pk', flat=True)[:10])
+        self.bulk_authors = list(User.objects.exclude(
+            follower__user=self.user
+        ).exclude(pk=self.user.pk).order_by('-pk').values_list(
+            'pk', flat=True
+        )[:10])
+        self.tags = list(Tags.objects.values_list('slug', flat=True)[:2])
+        self.ingredient = self.recipe.ingredients.values_list(
+            'ingredients_id', flat=True
+        )[0]
+        self.own_recipe.ingredients.create(
+            ingredients_id=self.ingredient, amount=10
+        )
+        self.image = image_data_uri()
+
+    def recipe_payload(self, name):
+        return {
+            'ingredients': [{'id': self.ingredient, 'amount': 10}],
+            'tags': [Tags.objects.values_list('pk', flat=True).first()],
+            'image': self.image,
+            'name': name,
+            'text': 'Описание',
+            'cooking_time': 15,
+        }
+
+    def create_recipe(self):
+        recipe = Recipe.objects.create(
+            author=self.user, name='Удаляемый', text='Описание',
+            cooking_time=5, image='recipes/seed.png',
+        )
+        return {'pk': recipe.pk}
+
+    def create_token(self):
+        user = User.objects.exclude(pk=self.user.pk).order_by('pk').first()
+        Token.objects.filter(user=user).delete()
+        token = Token.objects.create(user=user)
+        return {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+
+    def reset_password(self):
+        self.user.set_password(SEED_PASSWORD)
+        self.user.save(update_fields=['password'])
+        Token.objects.get_or_create(key=self.token.key, user=self.user)
+
+    def cases(self):
+        user = self.user
+        recipe = self.recipe.pk
+        author = self.author.pk
+        own = self.own_recipe.pk
+        favorite = FavoriteRecipe.objects.filter(user=user, recipe=recipe)
+        cart = ShoppingCart.objects.filter(user=user, recipe=recipe)
+        follow = Follow.objects.filter(user=user, author=author)
+        tags = '&'.join(f'tags={slug}' for slug in self.tags)
+        return [
+            Case('tags-list', 'get', '/api/tags/', auth=False),
+            Case('tags-detail', 'get', '/api/tags/{tag}/', auth=False,
+                 setup=lambda: {
+                     'tag': Tags.objects.values_list('pk', flat=True)[0]
+                 }),
+            Case('ingredients-search', 'get', '/api/ingredients/?name=ин',
+                 auth=False),
+            # Авторизованные запросы минуют кэш ответов и замеряют сам
+            # поиск: по одной букве находятся все ингредиенты
+            Case('ingredients-search-letter', 'get',
+                 '/api/ingredients/?name=и'),
+            Case('ingredients-search-word', 'get',
+                 '/api/ingredients/?name=ингредиент 99'),
+            Case('ingredients-detail', 'get',
+                 f'/api/ingredients/{self.ingredient}/', auth=False),
+            Case('recipes-list-anon', 'get', '/api/recipes/?page=2&limit=6',
+                 auth=False),
+            Case('recipes-list', 'get', '/api/recipes/?page=2&limit=6'),
+            Case('recipes-list-tags', 'get',
+                 f'/api/recipes/?limit=6&{tags}'),
+            Case('recipes-list-author', 'get',
+                 f'/api/recipes/?limit=6&author={author}'),
+            Case('recipes-list-favorited', 'get',
+                 '/api/recipes/?limit=6&is_favorited=1'),
+            Case('recipes-list-cart', 'get',
+                 '/api/recipes/?limit=6&is_in_shopping_cart=1'),
+            Case('recipes-list-cursor', 'get',
+                 '/api/recipes/?limit=6&cursor='),
+            Case('recipes-detail', 'get', f'/api/recipes/{recipe}/'),
+            Case('recipes-create', 'post', '/api/recipes/',
+                 data=self.recipe_payload('Новый рецепт'), status=201,
+                 teardown=lambda: Recipe.objects.filter(
+                     author=user, name='Новый рецепт'
+                 ).delete()),
+            Case('recipes-update', 'patch', f'/api/recipes/{own}/',
+                 data={'name': 'Свой рецепт', 'text': 'Описание',
+                       'cooking_time': 20}),
+            Case('recipes-delete', 'delete', '/api/recipes/{pk}/',
+                 status=204, setup=self.create_recipe),
+            Case('favorite-add', 'post', f'/api/recipes/{recipe}/favorite/',
+                 status=201, teardown=favorite.delete),
+            Case('favorite-remove', 'delete',
+                 f'/api/recipes/{recipe}/favorite/', status=204,
+                 setup=lambda: FavoriteRecipe.objects.create(
+                     user=user, recipe_id=recipe
+                 )),
+            Case('favorite-bulk', 'post', '/api/recipes/favorite/',
+                 data={'ids': self.bulk_recipes},
+                 teardown=FavoriteRecipe.objects.filter(
+                     user=user, recipe__in=self.bulk_recipes
+                 ).delete),
+            Case('cart-add', 'post', f'/api/recipes/{recipe}/shopping_cart/',
+                 status=201, teardown=cart.delete),
+            Case('cart-remove', 'delete',
+                 f'/api/recipes/{recipe}/shopping_cart/', status=204,
+                 setup=lambda: ShoppingCart.objects.create(
+                     user=user, recipe_id=recipe
+                 )),
+            Case('cart-bulk', 'post', '/api/recipes/shopping_cart/',
+                 data={'ids': self.bulk_recipes},
+                 teardown=ShoppingCart.objects.filter(
+                     user=user, recipe__in=self.bulk_recipes
+                 ).delete),
+            Case('download-txt', 'get',
+                 '/api/recipes/download_shopping_cart/?format=txt',
+                 teardown=cache.clear),
+            Case('download-csv', 'get',
+                 '/api/recipes/download_shopping_cart/?format=csv',
+                 teardown=cache.clear),
+            Case('download-pdf', 'get',
+                 '/api/recipes/download_shopping_cart/?format=pdf',
+                 teardown=cache.clear),
+            Case('subscribe', 'post', f'/api/users/{author}/subscribe/',
+                 status=201, teardown=follow.delete),
+            Case('unsubscribe', 'delete', f'/api/users/{author}/subscribe/',
+                 status=204, setup=lambda: Follow.objects.create(
+                     user=user, author_id=author
+                 )),
+            Case('subscribe-bulk', 'post', '/api/users/subscribe/',
+                 data={'ids': self.bulk_authors},
+                 teardown=Follow.objects.filter(
+                     user=user, author__in=self.bulk_authors
+                 ).delete),
+            Case('subscriptions', 'get',
+                 '/api/users/subscriptions/?limit=6&recipes_limit=3'),
+            Case('users-list', 'get', '/api/users/?limit=6', auth=False),
+            Case('users-detail', 'get', f'/api/users/{author}/'),
+            Case('users-me', 'get', '/api/users/me/'),
+            Case('users-create', 'post', '/api/users/', auth=False,
+                 data={'email': 'bench@example.com', 'username': 'bench',
+                       'first_name': 'Bench', 'last_name': 'Bench',
+                       'password': 'Bench-password-1'},
+                 status=201,
+                 teardown=User.objects.filter(username='bench').delete),
+            Case('users-set-password', 'post', '/api/users/set_password/',
+                 data={'current_password': SEED_PASSWORD,
+                       'new_password': 'Bench-password-2'},
+                 status=204, teardown=self.reset_password),
+            Case('token-login', 'post', '/api/auth/token/login/',
+                 auth=False, data={'email': user.email,
+                                   'password': SEED_PASSWORD}),
+            Case('token-logout', 'post', '/api/auth/token/logout/',
+                 auth=False, status=204, setup=self.create_token),
+        ]
+
+    def request(self, case):
+        params = case.setup() if case.setup else None
+        if not isinstance(params, dict):
+            params = {}
+        headers = {
+            key: value for key, value in params.items()
+            if key.startswith('HTTP_')
+        }
+        path = case.path.format(**params) if params else case.path
+        client = self.client if case.auth else self.anon
+        response = getattr(client, case.method)(
+            path, case.data, format='json', **headers
+        )
+        if getattr(response, 'streaming', False):
+            b''.join(response.streaming_content)
+        return response
+
+    def finish(self, case):
+        if case.teardown:
+            case.teardown()
+
+    def run(self, case):
+        """Задержки по итерациям, число запросов и пик памяти"""
+        response = self.request(case)
+        self.finish(case)
+        if response.status_code != case.status:
+            return {'name': case.name, 'error': (
+                f'статус {response.status_code}, ожидался {case.status}'
+            )}
+
+        timings = []
+        for _ in range(self.iterations):
+            start = time.perf_counter()
+            self.request(case)
+            timings.append((time.perf_counter() - start) * 1000)
+            self.finish(case)
+
+        # Отдельный проход: tracemalloc и сбор SQL замедляют запрос
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as queries:
+            self.request(case)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.finish(case)
+
+        timings.sort()
+        return {
+            'name': case.name,
+            'queries': len(queries),
+            'p50_ms': percentile(timings, 50),
+            'p95_ms': percentile(timings, 95),
+            'memory_kib': peak // 1024,
+        }
+
+
+def percentile(values, percent):
+    """Перцентиль отсортированного списка (метод ближайшего ранга)"""
+    index = max(0, -(-len(values) * percent // 100) - 1)
+    return round(values[index], 2)
@@ -1,13 +1,28 @@
-from django.db.models import Case, Q, When
-from django.db.models.functions import Lower
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
-from recipes.models import Recipe, Tags
+from recipes.models import Recipe, TagRecipe, Tags
+
+from .metrics import record_cache
+from .search import get_ingredient_search
+from .versions import get_versions
+
+
+def get_tag_ids(slugs):
+    """Id тегов по слагам; соответствие кэшируется до изменения тегов"""
+    version, = get_versions('tags')
+    cached_version, tag_ids = cache.get('tag_ids', (None, None))
+    record_cache('tag_ids', cached_version == version)
+    if cached_version != version:
+        tag_ids = dict(Tags.objects.values_list('slug', 'pk'))
+        cache.set('tag_ids', (version, tag_ids), None)
+    return [tag_ids[slug] for slug in slugs if slug in tag_ids]
 
 
 class RecipeFilter(FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(field_name='tags__slug',
-                                             to_field_name='slug',
-                                             queryset=Tags.objects.all())
+    tags = filters.CharFilter(
+        method='filter_tags'
+    )
 
     author = filters.CharFilter(
         method='filter_author'
@@ -23,6 +38,17 @@ class RecipeFilter(FilterSet):
         model = Recipe
         fields = ('tags', 'author',)
 
+    def filter_tags(self, queryset, name, value):
+        # Полусоединение через EXISTS не размножает рецепты с несколькими
+        # выбранными тегами, поэтому DISTINCT не нужен и лента остается
+        # упорядоченной по индексу pub_date
+        tag_ids = get_tag_ids(self.request.query_params.getlist('tags'))
+        if not tag_ids:
+            return queryset.none()
+        return queryset.filter(Exists(
+            TagRecipe.objects.filter(recipe=OuterRef('pk'), tag__in=tag_ids)
+        ))
+
     def filter_author(self, queryset, name, value):
         filter_author = self.request.query_params.get('author')
         if filter_author:
@@ -47,20 +73,6 @@ class IngredientsFilter(FilterSet):
     def filter_queryset(self, queryset):
         search_query = self.request.query_params.get('name')
         if search_query:
-            queryset = queryset.filter(
-                Q(
-                    name__startswith=search_query
-                ) | Q(
-                    name__icontains=search_query
-                )
-            ).annotate(
-                lower_name=Lower('name')
-            ).order_by(
-                Case(
-                    When(
-                        lower_name__startswith=search_query, then=0
-                    ), default=1
-                ), 'name'
-            )
+            queryset = get_ingredient_search().search(queryset, search_query)
 
         return queryset
@@ -0,0 +1,193 @@
+import base64
+import binascii
+import hashlib
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+UPLOAD_TO = 'recipes/'
+ORIGINAL = 'original'
+
+# Кратно 4, чтобы каждый кусок base64 декодировался отдельно
+CHUNK_SIZE = 64 * 1024
+DATA_URI_RE = re.compile(r'data:[^,]*;base64,')
+
+SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+)
+
+# Форматы, которые сохраняются без перекодирования
+EXTENSIONS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'GIF': 'gif',
+    'WEBP': 'webp',
+}
+
+
+class ImageProcessingError(Exception):
+    pass
+
+
+class ImageWorkerPool:
+    """Ограниченный пул потоков для разбора и пережатия картинок.
+
+    Pillow отпускает GIL при декодировании и масштабировании, поэтому
+    тяжелая работа идет параллельно, но одновременно выполняется не
+    больше IMAGE_WORKERS задач на процесс. Потоки создаются при первой
+    задаче, то есть уже в воркере после fork.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.IMAGE_WORKERS,
+                        thread_name_prefix='images',
+                    )
+        return self._executor
+
+    def run(self, fn, *args):
+        try:
+            return self.executor.submit(fn, *args).result(
+                timeout=settings.IMAGE_PROCESSING_TIMEOUT
+            )
+        except TimeoutError:
+            raise ImageProcessingError('Превышено время обработки картинки')
+
+
+image_pool = ImageWorkerPool()
+
+
+def decode_base64_image(data):
+    """Декодирует data URI с картинкой во временный файл по частям.
+
+    Размер результата проверяется до декодирования, а в памяти
+    держится не больше IMAGE_SPOOL_MAX_MEMORY байт, остальное
+    уходит на диск.
+    """
+    match = DATA_URI_RE.match(data)
+    if match is None:
+        raise ImageProcessingError('Ожидается картинка в формате data URI')
+    start = match.end()
+    size = (len(data) - start) // 4 * 3 - data[-2:].count('=')
+    if size > settings.RECIPE_IMAGE_MAX_SIZE:
+        raise ImageProcessingError('Слишком большой файл')
+
+    file = SpooledTemporaryFile(max_size=settings.IMAGE_SPOOL_MAX_MEMORY)
+    try:
+        for offset in range(start, len(data), CHUNK_SIZE):
+            file.write(base64.b64decode(
+                data[offset:offset + CHUNK_SIZE], validate=True
+            ))
+    except binascii.Error:
+        file.close()
+        raise ImageProcessingError('Некорректные данные base64')
+    file.seek(0)
+    return file
+
+
+def detect_format(file):
+    """Формат картинки по первым байтам файла"""
+    header = file.read(12)
+    file.seek(0)
+    for signature, format in SIGNATURES:
+        if header.startswith(signature):
+            return format
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    raise ImageProcessingError('Формат файла не поддерживается')
+
+
+def open_image(file, format):
+    """Открывает и полностью декодирует картинку"""
+    try:
+        image = Image.open(file, formats=[format])
+        width, height = image.size
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            raise ImageProcessingError('Слишком большое изображение')
+        image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise ImageProcessingError('Файл не является изображением')
+    return image
+
+
+def encode(image, format, **options):
+    buffer = BytesIO()
+    if format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    image.save(buffer, format=format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def render_variants(file, format):
+    """Исходник и его варианты: {вариант: (расширение, файл)}"""
+    image = open_image(file, format)
+    files = {ORIGINAL: (EXTENSIONS[format], File(file))}
+
+    thumbnail = ImageOps.exif_transpose(image)
+    thumbnail.thumbnail(settings.RECIPE_IMAGE_THUMBNAIL_SIZE, Image.LANCZOS)
+    thumbnail_format = 'JPEG' if format == 'JPEG' else 'PNG'
+    files['thumbnail'] = (
+        EXTENSIONS[thumbnail_format],
+        encode(thumbnail, thumbnail_format, optimize=True),
+    )
+    if features.check('webp'):
+        quality = settings.RECIPE_IMAGE_WEBP_QUALITY
+        if format != 'WEBP':
+            files['webp'] = (
+                'webp', encode(ImageOps.exif_transpose(image), 'WEBP',
+                               quality=quality),
+            )
+        files['thumbnail_webp'] = (
+            'webp', encode(thumbnail, 'WEBP', quality=quality),
+        )
+    return files
+
+
+def file_digest(file):
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def store_image(file):
+    """Сохраняет картинку и ее варианты под именами из хэша содержимого.
+
+    Возвращает (имя исходника, {вариант: имя файла}). Одинаковые
+    картинки сохраняются один раз, а файл под таким именем никогда не
+    меняется, поэтому его можно кэшировать бессрочно.
+    """
+    format = detect_format(file)
+    digest = file_digest(file)[:32]
+    names = {}
+    for variant, (extension, data) in render_variants(file, format).items():
+        suffix = '' if variant == ORIGINAL else f'_{variant}'
+        name = f'{UPLOAD_TO}{digest}{suffix}.{extension}'
+        if not default_storage.exists(name):
+            name = default_storage.save(name, data)
+        names[variant] = name
+    return names.pop(ORIGINAL), names
+
+
+def process_image(file):
+    """Разбирает и сохраняет картинку в пуле image_pool"""
+    return image_pool.run(store_image, file)
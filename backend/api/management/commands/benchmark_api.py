@@ -0,0 +1,136 @@
+import json
+import tempfile
+
+from api.benchmark import Benchmark
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from recipes.seed import seed
+
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет число SQL-запросов, задержку p50/p95 и пик памяти для '
+        'маршрутов API на синтетических данных в тестовой базе'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--follows', type=int, default=10)
+        parser.add_argument('--favorites', type=int, default=10)
+        parser.add_argument('--cart', type=int, default=5)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument(
+            '--case', action='append', default=[],
+            help='Запускать только замеры, в имени которых есть строка',
+        )
+        parser.add_argument(
+            '--budgets',
+            help='JSON: {"имя замера" или "*": {"queries": N, '
+                 '"p95_ms": N, "memory_kib": N}}',
+        )
+        parser.add_argument('--json', help='Сохранить результаты в файл')
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        budgets = {}
+        if options['budgets']:
+            with open(options['budgets'], encoding='utf-8') as budgets_file:
+                budgets = json.load(budgets_file)
+
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb']
+        )
+        try:
+            with tempfile.TemporaryDirectory() as media_root:
+                with override_settings(
+                    CACHES=BENCHMARK_CACHES,
+                    MEDIA_ROOT=media_root,
+                    ALLOWED_HOSTS=['testserver'],
+                ):
+                    results = self.run_benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb']
+            )
+
+        failures = self.check_budgets(results, budgets)
+        self.report(results)
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+        if failures:
+            raise CommandError(
+                'Превышены ограничения:\n' + '\n'.join(failures)
+            )
+
+    def run_benchmark(self, options):
+        self.stdout.write('Подготовка данных...')
+        user_ids = seed(
+            users=options['users'],
+            recipes=options['recipes'],
+            follows=options['follows'],
+            favorites=options['favorites'],
+            cart=options['cart'],
+            ingredients=options['ingredients'],
+            random_seed=options['seed'],
+        )
+        benchmark = Benchmark(user_ids, iterations=options['iterations'])
+        results = []
+        for case in benchmark.cases():
+            if options['case'] and not any(
+                name in case.name for name in options['case']
+            ):
+                continue
+            result = benchmark.run(case)
+            result['budget'] = {'queries': case.queries}
+            results.append(result)
+        return results
+
+    def check_budgets(self, results, budgets):
+        failures = []
+        for result in results:
+            if 'error' in result:
+                failures.append(f"{result['name']}: {result['error']}")
+                continue
+            budget = {
+                key: value for key, value in result.pop('budget').items()
+                if value is not None
+            }
+            budget.update(budgets.get('*', {}))
+            budget.update(budgets.get(result['name'], {}))
+            result['budget'] = budget
+            for metric, limit in budget.items():
+                if result[metric] > limit:
+                    failures.append(
+                        f"{result['name']}: {metric} = {result[metric]} "
+                        f"> {limit}"
+                    )
+        return failures
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'замер':<28}{'запросы':>8}{'p50, мс':>10}{'p95, мс':>10}"
+            f"{'память, КиБ':>13}"
+        )
+        for result in results:
+            if 'error' in result:
+                self.stdout.write(
+                    f"{result['name']:<28}{result['error']}"
+                )
+                continue
+            self.stdout.write(
+                f"{result['name']:<28}{result['queries']:>8}"
+                f"{result['p50_ms']:>10}{result['p95_ms']:>10}"
+                f"{result['memory_kib']:>13}"
+            )
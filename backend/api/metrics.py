@@ -0,0 +1,113 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import Http404, HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+REQUESTS = Counter(
+    'http_requests',
+    'Число HTTP-запросов',
+    ['view', 'action', 'method', 'status'],
+)
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'Время обработки HTTP-запроса',
+    ['view', 'action'],
+)
+DB_QUERIES = Histogram(
+    'db_queries_per_request',
+    'Число SQL-запросов на HTTP-запрос',
+    ['view', 'action'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, float('inf')),
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests',
+    'Обращения к кэшу',
+    ['cache', 'result'],
+)
+SHOPPING_CART_RENDER = Histogram(
+    'shopping_cart_render_seconds',
+    'Время сборки документа со списком покупок',
+    ['format'],
+)
+
+
+def record_cache(name, hit):
+    """Учитывает попадание или промах кэша name"""
+    CACHE_REQUESTS.labels(name, 'hit' if hit else 'miss').inc()
+
+
+def view_labels(request):
+    """Метки (view, action): класс вьюсета и его действие.
+
+    Для вьюсетов DRF действие берется из привязки методов к action,
+    для остальных представлений DRF - HTTP-метод.
+    """
+    match = request.resolver_match
+    if match is None:
+        return 'unmatched', ''
+    view_class = getattr(match.func, 'cls', None)
+    if view_class is None:
+        return match.func.__name__, ''
+    method = request.method.lower()
+    actions = getattr(match.func, 'actions', None) or {}
+    return view_class.__name__, actions.get(method, method)
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Число, время и SQL-запросы HTTP-запросов по вьюсетам и действиям.
+
+    Включается настройкой METRICS_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        view, action = view_labels(request)
+        REQUESTS.labels(
+            view, action, request.method, response.status_code
+        ).inc()
+        REQUEST_DURATION.labels(view, action).observe(duration)
+        DB_QUERIES.labels(view, action).observe(queries.count)
+        return response
+
+
+def metrics(request):
+    """Метрики в текстовом формате Prometheus.
+
+    Если задан PROMETHEUS_MULTIPROC_DIR, метрики всех воркеров
+    gunicorn собираются из их файлов в этом каталоге.
+    """
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    registry = REGISTRY
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
@@ -1,6 +1,200 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+from recipes.counters import count_subquery
 from recipes.models import FavoriteRecipe, ShoppingCart
 from rest_framework import filters, mixins, serializers, viewsets
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+
+from .metrics import record_cache
+from .versions import get_versions
+
+
+class ConditionalGetMixin:
+    """ETag/Last-Modified, ответы 304 и Cache-Control для list/retrieve.
+
+    Состояние ресурса вычисляется до выборки данных, поэтому при
+    совпадении валидаторов запрос к данным не выполняется.
+    """
+    cache_control = {}
+    vary_headers = ()
+    version_models = ()
+
+    def get_conditional_state(self):
+        """(etag, last_modified) текущего состояния или None"""
+        if not self.version_models:
+            return None
+        versions = get_versions(*self.version_models)
+        return '-'.join(map(str, versions)), max(versions) // 10 ** 6
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        state = self.get_conditional_state()
+        if state is None:
+            return handler(request, *args, **kwargs)
+
+        etag, last_modified = state
+        response = get_conditional_response(
+            request, etag=quote_etag(etag), last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = quote_etag(etag)
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(response, **self.cache_control)
+            if self.vary_headers:
+                patch_vary_headers(response, self.vary_headers)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class CachedListMixin:
+    """Кэширует ответы list для анонимных пользователей.
+
+    Ключ строится из версий моделей response_cache_models и параметров
+    запроса response_cache_params, поэтому изменение любой из моделей
+    делает старые записи недостижимыми.
+    """
+    response_cache_models = ()
+    response_cache_params = ()
+
+    def get_response_cache_key(self, request):
+        params = [
+            (param, sorted(request.query_params.getlist(param)))
+            for param in self.response_cache_params
+        ]
+        digest = hashlib.md5(repr(
+            (get_versions(*self.response_cache_models), params)
+        ).encode()).hexdigest()
+        return f'response:{self.basename}:{digest}'
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated or not self.response_cache_models:
+            return super().list(request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        record_cache('response', data is not None)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+
+BULK_ACTIONS = {'post': 'create', 'delete': 'destroy'}
+
+
+class BulkRelationMixin:
+    """Пакетное добавление и удаление связей пользователя с объектами.
+
+    Принимает {"ids": [...]} и отвечает статусом для каждого id.
+    Связи создаются одним bulk_create и удаляются одним DELETE; сигналы
+    при этом не вызываются, поэтому счетчик counter_field у затронутых
+    объектов пересчитывается одним UPDATE.
+    Действия привязываются к методам явно, см. BULK_ACTIONS.
+    """
+    permission_classes = (IsAuthenticated,)
+    relation_model = None
+    target_model = None
+    target_field = None
+    counter_field = None
+
+    def get_ids(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return list(dict.fromkeys(serializer.validated_data['ids']))
+
+    def get_forbidden_ids(self, ids):
+        """id, связь с которыми создавать нельзя"""
+        return set()
+
+    def get_relations(self, ids):
+        return self.relation_model.objects.filter(**{
+            'user': self.request.user,
+            f'{self.target_field}__in': ids,
+        })
+
+    def update_counters(self, ids):
+        if self.counter_field and ids:
+            self.target_model.objects.filter(pk__in=ids).update(**{
+                self.counter_field: count_subquery(
+                    self.relation_model, self.target_field
+                ),
+            })
+
+    def results(self, ids, statuses):
+        return Response({'results': [
+            {'id': pk, 'status': statuses[pk]} for pk in ids
+        ]})
+
+    def create(self, request, *args, **kwargs):
+        ids = self.get_ids(request)
+        found = set(self.target_model.objects.filter(
+            pk__in=ids
+        ).values_list('pk', flat=True))
+        forbidden = self.get_forbidden_ids(found)
+        with transaction.atomic():
+            existing = set(self.get_relations(found).values_list(
+                f'{self.target_field}_id', flat=True
+            ))
+            statuses = {}
+            for pk in ids:
+                if pk not in found:
+                    statuses[pk] = 'not_found'
+                elif pk in forbidden:
+                    statuses[pk] = 'forbidden'
+                elif pk in existing:
+                    statuses[pk] = 'exists'
+                else:
+                    statuses[pk] = 'created'
+            created = [pk for pk in ids if statuses[pk] == 'created']
+            self.relation_model.objects.bulk_create(
+                [
+                    self.relation_model(**{
+                        'user': request.user,
+                        f'{self.target_field}_id': pk,
+                    })
+                    for pk in created
+                ],
+                ignore_conflicts=True,
+            )
+            self.update_counters(created)
+        return self.results(ids, statuses)
+
+    def destroy(self, request, *args, **kwargs):
+        ids = self.get_ids(request)
+        with transaction.atomic():
+            relations = self.get_relations(ids)
+            deleted = set(relations.values_list(
+                f'{self.target_field}_id', flat=True
+            ))
+            # Одним DELETE без сборщика Django и сигналов для каждой
+            # строки: у связей нет зависимых объектов, версии кэша от них
+            # не зависят, а счетчики пересчитываются одним UPDATE
+            relations._raw_delete(relations.db)
+            self.update_counters(deleted)
+        return self.results(ids, {
+            pk: 'deleted' if pk in deleted else 'not_found' for pk in ids
+        })
 
 
 class ReadOnlyUserViewSet(
@@ -19,6 +213,8 @@ class RecipeFieldsMixin(serializers.Serializer):
     is_in_shopping_cart = serializers.SerializerMethodField()
 
     def get_is_in_shopping_cart(self, instance):
+        if hasattr(instance, 'is_in_shopping_cart'):
+            return instance.is_in_shopping_cart
 
         if (
             self.context.get('request')
@@ -31,6 +227,8 @@ class RecipeFieldsMixin(serializers.Serializer):
         return False
 
     def get_is_favorited(self, instance):
+        if hasattr(instance, 'is_favorited'):
+            return instance.is_favorited
 
         if (
             self.context.get('request')
@@ -1,5 +1,127 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from .metrics import record_cache
+
+
+def estimate_count(queryset):
+    """Оценка числа строк планировщиком PostgreSQL"""
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def get_count(queryset):
+    """Число объектов для ответа пагинатора.
+
+    Меньше PAGINATION_EXACT_COUNT_THRESHOLD объектов считаются точно.
+    Для больших выборок PostgreSQL отдает оценку планировщика, если
+    подсчет с LIMIT порога подтверждает, что объектов не меньше; такой
+    результат кэшируется по SQL запроса на PAGINATION_COUNT_CACHE_TIMEOUT.
+    """
+    threshold = settings.PAGINATION_EXACT_COUNT_THRESHOLD
+    if threshold is None:
+        return queryset.count()
+
+    try:
+        sql_with_params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    key = 'count:{}'.format(hashlib.md5(
+        repr(sql_with_params).encode()
+    ).hexdigest())
+    count = cache.get(key)
+    record_cache('count', count is not None)
+    if count is not None:
+        return count
+
+    if connections[queryset.db].vendor == 'postgresql':
+        count = estimate_count(queryset)
+    if count is not None and count >= threshold:
+        # Оценка бывает сильно завышена: ей верим, только если выборка
+        # действительно не меньше порога
+        exact = queryset[:threshold].count()
+        if exact < threshold:
+            return exact
+    else:
+        count = queryset.count()
+    if count >= threshold:
+        cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+class ApproximatePage(Page):
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class ApproximateCountPaginator(Paginator):
+    """Пагинатор, которому не нужен точный count.
+
+    Границы страниц определяются выборкой на одну запись больше
+    размера страницы, поэтому ссылки next/previous точны, даже если
+    count взят из кэша или оценки планировщика.
+    """
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, 'query'):
+            return get_count(self.object_list)
+        return len(self.object_list)
+
+    def validate_number(self, number):
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            return super().validate_number(number)
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(
+            self.object_list[bottom:bottom + self.per_page + 1]
+        )
+        if not object_list and number > 1:
+            raise EmptyPage('That page contains no results')
+        return ApproximatePage(
+            object_list[:self.per_page], number, self,
+            has_next=len(object_list) > self.per_page,
+        )
 
 
 class CustomPaginator(PageNumberPagination):
     page_size_query_param = 'limit'
+    django_paginator_class = ApproximateCountPaginator
+
+
+class RecipeCursorPaginator(CursorPagination):
+    """Пагинация ленты рецептов по курсору (pub_date, id).
+
+    Страницы выбираются по индексу pub_date без OFFSET и без COUNT(*).
+    Включается параметром cursor, для первой страницы - пустым.
+    """
+    page_size = 6
+    page_size_query_param = 'limit'
+    ordering = ('-pub_date', '-id')
@@ -0,0 +1,173 @@
+import contextvars
+import functools
+import json
+import logging
+import re
+import sys
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+current_profile = contextvars.ContextVar('current_profile', default=None)
+
+PLACEHOLDERS_RE = re.compile(r'%s(?:, %s)*')
+NUMBERS_RE = re.compile(r'\b\d+\b')
+TO_REPRESENTATION_CODE = serializers.Serializer.to_representation.__code__
+
+
+def sql_template(sql):
+    """SQL без значений: списки параметров и числа схлопываются"""
+    return NUMBERS_RE.sub('N', PLACEHOLDERS_RE.sub('%s', sql))
+
+
+def serializer_field():
+    """Поле сериализатора, при выводе которого выполняется запрос.
+
+    Ищется ближайший по стеку кадр Serializer.to_representation: его
+    локальная переменная field - текущее поле.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_code is TO_REPRESENTATION_CODE:
+            field = frame.f_locals.get('field')
+            if field is not None:
+                return '{}.{}'.format(
+                    type(frame.f_locals['self']).__name__, field.field_name
+                )
+        frame = frame.f_back
+    return None
+
+
+class RequestProfile:
+    """Запросы к базе и время одного HTTP-запроса.
+
+    Экземпляр подключается через connection.execute_wrapper и считает
+    число и время SQL-запросов, а для каждого шаблона SQL запоминает
+    поле сериализатора, из которого он был выполнен впервые.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+        self.templates = Counter()
+        self.origins = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            template = sql_template(sql)
+            self.templates[template] += 1
+            if template not in self.origins:
+                self.origins[template] = serializer_field()
+
+    def repeated_queries(self, threshold):
+        """Шаблоны SQL, выполненные больше threshold раз: вероятные N+1"""
+        return [
+            {
+                'count': count,
+                'field': self.origins[template],
+                'sql': template[:200],
+            }
+            for template, count in self.templates.most_common()
+            if count > threshold
+        ]
+
+
+def timed_representation(to_representation):
+    """Учитывает время сериализации в текущем профиле.
+
+    Засекается только внешний вызов, чтобы вложенные сериализаторы не
+    считались дважды.
+    """
+    @functools.wraps(to_representation)
+    def wrapper(self, instance):
+        profile = current_profile.get()
+        if profile is None or profile.serializing:
+            return to_representation(self, instance)
+        profile.serializing = True
+        start = time.perf_counter()
+        try:
+            return to_representation(self, instance)
+        finally:
+            profile.serializer_time += time.perf_counter() - start
+            profile.serializing = False
+    wrapper.timed = True
+    return wrapper
+
+
+def instrument_serializers():
+    for serializer_class in (serializers.Serializer,
+                             serializers.ListSerializer):
+        method = serializer_class.to_representation
+        if not getattr(method, 'timed', False):
+            serializer_class.to_representation = timed_representation(
+                method
+            )
+
+
+class RequestProfilingMiddleware:
+    """Число запросов к базе и время обработки каждого HTTP-запроса.
+
+    Включается настройкой REQUEST_PROFILING. Итоги отдаются в
+    заголовке Server-Timing и пишутся JSON-строкой в лог api.profiling;
+    шаблоны SQL, повторенные больше REQUEST_PROFILING_REPEAT_THRESHOLD
+    раз, попадают в лог предупреждением вместе с полем сериализатора.
+    Запросы, выполненные при отдаче потокового ответа, не учитываются.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        instrument_serializers()
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(profile):
+                response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        total = time.perf_counter() - start
+
+        response['Server-Timing'] = ', '.join((
+            f'db;desc="{profile.queries} queries";'
+            f'dur={profile.db_time * 1000:.2f}',
+            f'serializer;dur={profile.serializer_time * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ))
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': profile.queries,
+            'db_ms': round(profile.db_time * 1000, 2),
+            'serializer_ms': round(profile.serializer_time * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }
+        logger.info(json.dumps(record, ensure_ascii=False))
+        repeated = profile.repeated_queries(
+            settings.REQUEST_PROFILING_REPEAT_THRESHOLD
+        )
+        if repeated:
+            logger.warning(json.dumps(
+                {**record, 'repeated_queries': repeated},
+                ensure_ascii=False,
+            ))
+        return response
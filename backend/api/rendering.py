@@ -0,0 +1,47 @@
+import os
+import threading
+
+from django.conf import settings
+
+FONTS = {
+    'arial': 'arial.ttf',
+}
+
+
+class RenderingResources:
+    """Реестр ресурсов для выгрузки PDF.
+
+    Шрифты разбираются один раз на процесс при первой выгрузке
+    (или в ApiConfig.ready, если включен PDF_PREWARM), а не при
+    импорте модулей.
+    """
+
+    def __init__(self, fonts):
+        self.fonts = fonts
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def load(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            # reportlab импортируется здесь, чтобы не замедлять
+            # запуск процессов, которые не формируют PDF
+            from reportlab.pdfbase import pdfmetrics
+            from reportlab.pdfbase.ttfonts import TTFont
+
+            for name, filename in self.fonts.items():
+                pdfmetrics.registerFont(
+                    TTFont(name, os.path.join(settings.BASE_DIR, 'fonts',
+                                              filename))
+                )
+            self._loaded = True
+
+
+rendering_resources = RenderingResources(FONTS)
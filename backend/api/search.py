@@ -0,0 +1,152 @@
+import re
+import threading
+from bisect import bisect_left
+from functools import lru_cache
+from itertools import chain, islice
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+from recipes.models import Ingredients
+
+from .versions import bump_version, get_versions
+
+WORD_RE = re.compile(r'\w+')
+
+
+@lru_cache(maxsize=2 ** 17)
+def trigrams(value):
+    """Триграммы строки по правилам pg_trgm"""
+    result = set()
+    for word in WORD_RE.findall(value.lower()):
+        padded = f'  {word} '
+        result.update(
+            padded[i:i + 3] for i in range(len(padded) - 2)
+        )
+    return frozenset(result)
+
+
+def trigram_similarity(first, second):
+    """Аналог similarity() из pg_trgm для двух наборов триграмм"""
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+class TrigramIngredientSearch:
+    """Поиск ингредиентов в PostgreSQL по GIN-индексу pg_trgm.
+
+    Сначала идут совпадения по началу названия, затем остальные
+    вхождения по убыванию триграммной похожести.
+    """
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        return queryset.filter(
+            name__icontains=query
+        ).annotate(
+            prefix_rank=Case(
+                When(name__istartswith=query, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            ),
+            similarity=TrigramSimilarity('name', query),
+        ).order_by(
+            'prefix_rank', '-similarity', 'name'
+        )[:settings.INGREDIENT_SEARCH_MAX_RESULTS]
+
+
+class IngredientIndex:
+    """Индекс названий ингредиентов в памяти процесса.
+
+    Названия в нижнем регистре хранятся в отсортированном массиве:
+    совпадения по началу ищутся бинарным поиском, вхождения в
+    середину названия - проходом по массиву. Поиск возвращает id
+    найденных ингредиентов в порядке выдачи.
+    """
+
+    def __init__(self, rows):
+        self.rows = sorted((name.lower(), pk) for pk, name in rows)
+        self.keys = [row[0] for row in self.rows]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def search(self, query, limit=None):
+        query = query.lower()
+        start = bisect_left(self.keys, query)
+        end = bisect_left(self.keys, query + chr(0x10FFFF), start)
+        matches = [(0, row) for row in self.rows[start:end]]
+        matches.extend(
+            (1, row) for row in chain(
+                islice(self.rows, start), islice(self.rows, end, None)
+            ) if query in row[0]
+        )
+        query_trigrams = trigrams(query)
+        matches.sort(key=lambda match: (
+            match[0],
+            -trigram_similarity(query_trigrams, trigrams(match[1][0])),
+            match[1][0],
+        ))
+        return [pk for _, (_, pk) in matches[:limit]]
+
+
+def order_by_ids(queryset, ids):
+    """Объекты queryset с id из списка ids в порядке этого списка"""
+    if not ids:
+        return queryset.none()
+    return queryset.filter(pk__in=ids).order_by(Case(
+        *(When(pk=pk, then=Value(position))
+          for position, pk in enumerate(ids)),
+        output_field=IntegerField(),
+    ))
+
+
+class InMemoryIngredientSearch:
+    """Поиск ингредиентов по индексу в памяти процесса.
+
+    Индекс строится при первом запросе. Актуальность проверяется по
+    версии модели ингредиентов в общем кэше: при изменении ингредиентов
+    версия меняется, и каждый воркер перестраивает свой индекс.
+    """
+
+    def __init__(self):
+        self._index = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get_index(self):
+        version, = get_versions('ingredients')
+        if self._index is None or self._version != version:
+            with self._lock:
+                if self._index is None or self._version != version:
+                    self._index = IngredientIndex(
+                        Ingredients.objects.values_list('pk', 'name')
+                    )
+                    self._version = version
+        return self._index
+
+    def invalidate(self):
+        bump_version('ingredients')
+        self._index = None
+
+    def search(self, queryset, query):
+        # Порядок задается выражением CASE по id, поэтому число
+        # результатов ограничено так же, как в поиске PostgreSQL
+        return order_by_ids(queryset, self.get_index().search(
+            query, settings.INGREDIENT_SEARCH_MAX_RESULTS
+        ))
+
+
+trigram_search = TrigramIngredientSearch()
+in_memory_search = InMemoryIngredientSearch()
+
+
+def get_ingredient_search():
+    if (
+        settings.INGREDIENT_SEARCH_IN_MEMORY
+        or connection.vendor != 'postgresql'
+    ):
+        return in_memory_search
+    return trigram_search
@@ -1,14 +1,75 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
 from django.db import transaction
 from djoser.serializers import (TokenCreateSerializer, UserCreateSerializer,
                                 UserSerializer)
-from drf_base64.fields import Base64ImageField
 from recipes.models import (FavoriteRecipe, IngredientRecipe, Ingredients,
-                            Recipe, ShoppingCart, Tags, User)
+                            Recipe, Tags, User)
 from rest_framework import serializers
-from rest_framework.exceptions import NotFound
+from rest_framework.fields import SkipField
 from users.models import Follow
 
+from .images import (ImageProcessingError, decode_base64_image, detect_format,
+                     process_image)
 from .mixins import RecipeFieldsMixin
+from .utils import get_recipes_limit
+
+
+class RecipeImageField(serializers.ImageField):
+    """Картинка рецепта в base64 (data URI) или файлом.
+
+    При проверке картинка только декодируется; значение поля - файл,
+    который сохраняется вместе с превью и WebP-вариантами уже в create
+    и update, после проверки всех полей. Ссылка на уже загруженную
+    картинку при изменении рецепта оставляет ее без изменений.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) and data.startswith('http'):
+            if self.parent.instance is not None:
+                raise SkipField()
+            raise serializers.ValidationError(
+                'Ожидается картинка в формате data URI'
+            )
+        try:
+            if isinstance(data, str):
+                file = decode_base64_image(data)
+            elif hasattr(data, 'read'):
+                if data.size > settings.RECIPE_IMAGE_MAX_SIZE:
+                    raise ImageProcessingError('Слишком большой файл')
+                file = data
+            else:
+                self.fail('invalid')
+            detect_format(file)
+        except ImageProcessingError as error:
+            raise serializers.ValidationError(str(error))
+        return file
+
+
+def save_image(file):
+    """Сохраняет проверенную картинку рецепта в пуле обработки.
+
+    Возвращает (имя файла, {вариант: имя}).
+    """
+    try:
+        with file:
+            return process_image(file)
+    except ImageProcessingError as error:
+        raise serializers.ValidationError({'image': [str(error)]})
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Ссылки на превью и WebP-варианты картинки рецепта"""
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        urls = {}
+        for variant, name in value.items():
+            url = default_storage.url(name)
+            urls[variant] = (
+                request.build_absolute_uri(url) if request else url
+            )
+        return urls
 
 
 class UserRegistrationSerializer(UserCreateSerializer):
@@ -66,6 +127,8 @@ class CustomUserSerializer(UserSerializer):
         lookup_field = ('username',)
 
     def get_is_subscribed(self, instance):
+        if hasattr(instance, 'is_subscribed'):
+            return instance.is_subscribed
         if self.context:
             return (
                 self.context.get('request').user.is_authenticated
@@ -97,17 +160,12 @@ class IngredientRecipeSerializer(serializers.ModelSerializer):
 class CreateRecipeIngredientSerializer(serializers.ModelSerializer):
     """Сериализатор создания ингредиентов рецепта"""
     amount = serializers.IntegerField()
-    id = serializers.IntegerField(source='ingredients.id')
+    id = serializers.IntegerField(source='ingredients_id')
 
     class Meta:
         model = Ingredients
         fields = ('id', 'amount')
 
-    def validate_id(self, id):
-        if not Ingredients.objects.filter(id=id).exists():
-            raise NotFound(detail='Ингредиент не найден.')
-        return id
-
     def validate_amount(self, amount):
         if amount <= 0:
             raise serializers.ValidationError(
@@ -133,6 +191,7 @@ class RecipesSerializer(RecipeFieldsMixin, serializers.ModelSerializer):
     tags = TagsSerializer(many=True)
     ingredients = IngredientRecipeSerializer(many=True)
     author = CustomUserSerializer()
+    image_variants = ImageVariantsField()
 
     class Meta:
         fields = (
@@ -144,6 +203,7 @@ class RecipesSerializer(RecipeFieldsMixin, serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
         )
@@ -159,7 +219,8 @@ class CreateRecipesSerializer(RecipeFieldsMixin, serializers.ModelSerializer):
     ingredients = CreateRecipeIngredientSerializer(many=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
-    image = Base64ImageField()
+    image = RecipeImageField()
+    image_variants = ImageVariantsField()
     author = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
 
     class Meta:
@@ -172,6 +233,7 @@ class CreateRecipesSerializer(RecipeFieldsMixin, serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
         )
@@ -183,18 +245,29 @@ class CreateRecipesSerializer(RecipeFieldsMixin, serializers.ModelSerializer):
                 'Нужно указать минимум 1 ингредиент.'
             )
         for value in value_list:
-            if 'ingredients' not in value:
+            if 'ingredients_id' not in value:
                 raise serializers.ValidationError(
                     'ingredients - Обязательное поле.'
                 )
         inrgedients = [
-            item['ingredients']['id'] for item in value_list
+            item['ingredients_id'] for item in value_list
         ]
         unique_ingredients = set(inrgedients)
         if len(inrgedients) != len(unique_ingredients):
             raise serializers.ValidationError(
                 'Ингредиенты должны быть уникальны.'
             )
+        missing_ingredients = unique_ingredients - set(
+            Ingredients.objects.filter(
+                id__in=unique_ingredients
+            ).values_list('id', flat=True)
+        )
+        if missing_ingredients:
+            raise serializers.ValidationError(
+                'Ингредиенты не найдены: {}.'.format(
+                    ', '.join(map(str, sorted(missing_ingredients)))
+                )
+            )
         return value_list
 
     def validate_tags(self, value_list):
@@ -207,6 +280,9 @@ class CreateRecipesSerializer(RecipeFieldsMixin, serializers.ModelSerializer):
 
     def validate(self, value_list):
         for field in ['name', 'text', 'cooking_time']:
+            # PATCH передает только изменяемые поля
+            if self.partial and field not in value_list:
+                continue
             if not value_list.get(field):
                 raise serializers.ValidationError(
                     f'{field} - Обязательное поле.'
@@ -218,9 +294,7 @@ class CreateRecipesSerializer(RecipeFieldsMixin, serializers.ModelSerializer):
         IngredientRecipe.objects.bulk_create(
             [IngredientRecipe(
                 recipe=recipe,
-                ingredients=Ingredients.objects.get(
-                    pk=ingredient['ingredients']['id']
-                ),
+                ingredients_id=ingredient['ingredients_id'],
                 amount=ingredient['amount']
             ) for ingredient in ingredients]
         )
@@ -230,26 +304,69 @@ class CreateRecipesSerializer(RecipeFieldsMixin, serializers.ModelSerializer):
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        image_data = validated_data.pop('image')
-        recipe = Recipe.objects.create(**validated_data)
-        recipe.image.save('recipe_image.png', image_data, save=True)
+        image, image_variants = save_image(validated_data.pop('image'))
+        recipe = Recipe.objects.create(
+            image=image, image_variants=image_variants, **validated_data
+        )
         self.ingredients_tags_set(recipe, tags, ingredients)
 
         return recipe
 
+    def ingredients_update(self, recipe, ingredients):
+        amounts = {
+            ingredient['ingredients_id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        current = {
+            ingredient_recipe.ingredients_id: ingredient_recipe
+            for ingredient_recipe in recipe.ingredients.all()
+        }
+        changed = []
+        for ingredient_id, ingredient_recipe in current.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and ingredient_recipe.amount != amount:
+                ingredient_recipe.amount = amount
+                changed.append(ingredient_recipe)
+        removed = current.keys() - amounts.keys()
+
+        if removed:
+            IngredientRecipe.objects.filter(
+                recipe=recipe,
+                ingredients_id__in=removed,
+            ).delete()
+        if changed:
+            IngredientRecipe.objects.bulk_update(changed, ['amount'])
+        IngredientRecipe.objects.bulk_create(
+            [IngredientRecipe(
+                recipe=recipe,
+                ingredients_id=ingredient_id,
+                amount=amount
+            ) for ingredient_id, amount in amounts.items()
+                if ingredient_id not in current]
+        )
+
+    def tags_update(self, recipe, tags):
+        if {tag.pk for tag in tags} != set(
+            recipe.tags.values_list('pk', flat=True)
+        ):
+            recipe.tags.set(tags)
+
     @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('ingredients')
-        tags = validated_data.pop('tags')
-        instance.image = validated_data.get('image', instance.image)
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
+        if 'image' in validated_data:
+            instance.image, instance.image_variants = save_image(
+                validated_data['image']
+            )
         instance.name = validated_data.get('name', instance.name)
         instance.text = validated_data.get('text', instance.text)
         instance.cooking_time = validated_data.get(
             'cooking_time', instance.cooking_time)
-        IngredientRecipe.objects.filter(
-            recipe=instance,
-            ingredients__in=instance.ingredient.all()).delete()
-        self.ingredients_tags_set(instance, tags, ingredients)
+        if ingredients is not None:
+            self.ingredients_update(instance, ingredients)
+        if tags is not None:
+            self.tags_update(instance, tags)
         instance.save()
 
         return instance
@@ -257,29 +374,14 @@ class CreateRecipesSerializer(RecipeFieldsMixin, serializers.ModelSerializer):
 
 class RecipesNoAuthorSerializer(serializers.ModelSerializer):
     """Сериализатор получения автора сокращенный"""
-
-    def validate(self, validated_data):
-        user = self.initial_data['user']
-        recipe = self.initial_data['recipe']
-        if ShoppingCart.objects.filter(
-            user=user,
-            recipe=recipe
-        ).exists():
-            raise serializers.ValidationError(
-                {'errors': 'Рецепт уже в корзине'}
-            )
-        if not Recipe.objects.filter(id=recipe.id).exists():
-            raise serializers.ValidationError(
-                {'errors': 'Рецепт не найден'}
-            )
-
-        return validated_data
+    image_variants = ImageVariantsField()
 
     class Meta:
         fields = (
             'id',
             'name',
             'image',
+            'image_variants',
             'cooking_time',
         )
         model = Recipe
@@ -288,7 +390,7 @@ class RecipesNoAuthorSerializer(serializers.ModelSerializer):
 class SubscriptionsSerializer(CustomUserSerializer):
     """Сериализатор получения подписок"""
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta(CustomUserSerializer.Meta):
         fields = (
@@ -302,15 +404,11 @@ class SubscriptionsSerializer(CustomUserSerializer):
             'recipes_count',
         )
 
-    def get_recipes_count(self, instance):
-        return instance.recipes.count()
-
     def get_recipes(self, instance):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
+        limit = get_recipes_limit(self.context.get('request'))
         recipes = instance.recipes.all()
-        if limit:
-            recipes = recipes[:int(limit)]
+        if limit is not None:
+            recipes = recipes[:limit]
         serializer = RecipesNoAuthorSerializer(
             recipes,
             many=True,
@@ -326,7 +424,7 @@ class SubscribeSerializer(CustomUserSerializer):
         read_only=True,
         instance='follower'
     )
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
     email = serializers.ReadOnlyField()
     username = serializers.ReadOnlyField()
     is_subscribed = serializers.SerializerMethodField()
@@ -344,22 +442,14 @@ class SubscribeSerializer(CustomUserSerializer):
         )
         model = User
 
-    def get_recipes_count(self, instance):
-        return instance.recipes.count()
 
-    def validate(self, validated_data):
-        user = self.initial_data['user']
-        author = self.initial_data['author']
-        if user == author:
-            raise serializers.ValidationError(
-                {'errors': 'Нельзя подписаться на себя'}
-            )
-        if Follow.objects.filter(user=user, author=author).exists():
-            raise serializers.ValidationError(
-                {'errors': 'Вы уже подписаны на этого автора'}
-            )
-
-        return validated_data
+class BulkIdsSerializer(serializers.Serializer):
+    """Сериализатор списка id для пакетных операций"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_MAX_ITEMS,
+    )
 
 
 class IngredientsSerializer(serializers.ModelSerializer):
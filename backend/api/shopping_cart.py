@@ -0,0 +1,189 @@
+import csv
+import hashlib
+import time
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import (Case, CharField, Count, F, IntegerField, Max,
+                              Sum, Value, When)
+from recipes.models import IngredientRecipe, ShoppingCart
+
+from .metrics import SHOPPING_CART_RENDER, record_cache
+from .rendering import rendering_resources
+from .versions import get_versions
+
+CHUNK_SIZE = 64 * 1024
+
+
+def get_cart_ingredients(user):
+    """Суммирует ингредиенты рецептов из корзины пользователя.
+
+    Группировка по названию и единице измерения выполняется в БД.
+    При включенной SHOPPING_CART_CONVERT_UNITS единицы из
+    SHOPPING_CART_UNIT_CONVERSIONS приводятся к базовым до суммирования,
+    остальные единицы остаются как есть. Возвращает итератор кортежей
+    (название, количество, единица измерения).
+    """
+    conversions = {}
+    if settings.SHOPPING_CART_CONVERT_UNITS:
+        conversions = settings.SHOPPING_CART_UNIT_CONVERSIONS
+    unit = F('ingredients__measurement_unit')
+    amount = F('amount')
+    if conversions:
+        unit = Case(
+            *[When(ingredients__measurement_unit=source, then=Value(target))
+              for source, (target, _) in conversions.items()],
+            default=unit,
+            output_field=CharField(),
+        )
+        amount = amount * Case(
+            *[When(ingredients__measurement_unit=source, then=Value(factor))
+              for source, (_, factor) in conversions.items()],
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+
+    return (
+        IngredientRecipe.objects
+        .filter(recipe__recipe_in_cart__user=user)
+        .annotate(name=F('ingredients__name'), unit=unit)
+        .values('name', 'unit')
+        .annotate(total_amount=Sum(amount))
+        .order_by('name', 'unit')
+        .values_list('name', 'total_amount', 'unit')
+        .iterator()
+    )
+
+
+def get_cart_fingerprint(user):
+    """Отпечаток состояния корзины: меняется при любом изменении
+    состава корзины, рецептов в ней или справочника ингредиентов.
+
+    Ингредиенты учитываются по версии 'ingredients': массовые изменения
+    в обход сигналов должны вызывать bump_version('ingredients') сами.
+    """
+    state = ShoppingCart.objects.filter(user=user).aggregate(
+        recipes=Count('pk'),
+        recipes_sum=Sum('recipe_id'),
+        last_added=Max('pk'),
+        last_updated=Max('recipe__updated_at'),
+    )
+    return hashlib.md5(repr(
+        (sorted(state.items()), get_versions('ingredients'))
+    ).encode()).hexdigest()
+
+
+class ShoppingListExport:
+    """Базовый класс выгрузки списка покупок"""
+    format = None
+    content_type = None
+
+    def __init__(self, ingredients):
+        self.ingredients = ingredients
+
+    def render(self):
+        raise NotImplementedError
+
+
+class TextExport(ShoppingListExport):
+    """Выгрузка списка покупок в текстовом виде"""
+    format = 'txt'
+    content_type = 'text/plain; charset=utf-8'
+
+    def render(self):
+        yield 'Список покупок:\n'.encode()
+        for name, amount, unit in self.ingredients:
+            yield f'- {name} - {amount} {unit}\n'.encode()
+
+
+class CsvExport(ShoppingListExport):
+    """Выгрузка списка покупок в CSV"""
+    format = 'csv'
+    content_type = 'text/csv; charset=utf-8'
+
+    def render(self):
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(('name', 'amount', 'measurement_unit'))
+        for ingredient in self.ingredients:
+            writer.writerow(ingredient)
+            if buffer.tell() >= CHUNK_SIZE:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode()
+
+
+class PdfExport(ShoppingListExport):
+    """Выгрузка списка покупок в PDF с разбивкой на страницы"""
+    format = 'pdf'
+    content_type = 'application/pdf'
+    font = 'arial'
+    font_size = 22
+    left = 100
+    top = 750
+    bottom = 50
+    line_height = 30
+
+    def render(self):
+        from reportlab.lib.pagesizes import A4
+        from reportlab.pdfgen import canvas
+
+        rendering_resources.load()
+        buffer = BytesIO()
+        p = canvas.Canvas(buffer, pagesize=A4)
+        p.setFont(self.font, self.font_size)
+        p.drawString(self.left, self.top, 'Список покупок:')
+
+        y = self.top - self.line_height
+        for name, amount, unit in self.ingredients:
+            y -= self.line_height
+            if y < self.bottom:
+                p.showPage()
+                p.setFont(self.font, self.font_size)
+                y = self.top
+            p.drawString(self.left, y, f'- {name} - {amount} {unit}')
+
+        p.showPage()
+        p.save()
+        buffer.seek(0)
+        return iter(lambda: buffer.read(CHUNK_SIZE), b'')
+
+
+EXPORTS = {
+    export.format: export for export in (PdfExport, TextExport, CsvExport)
+}
+
+
+def _render_and_cache(export, key):
+    # Время сборки не включает ожидание, пока клиент читает ответ
+    chunks = []
+    duration = 0.0
+    render = export.render()
+    while True:
+        start = time.perf_counter()
+        chunk = next(render, None)
+        duration += time.perf_counter() - start
+        if chunk is None:
+            break
+        chunks.append(chunk)
+        yield chunk
+    SHOPPING_CART_RENDER.labels(export.format).observe(duration)
+    cache.set(key, b''.join(chunks), settings.SHOPPING_CART_CACHE_TIMEOUT)
+
+
+def stream_shopping_list(user, export_class):
+    """Итератор по готовому документу: из кэша, если корзина
+    не менялась, иначе документ собирается заново и кэшируется"""
+    key = 'shopping_cart:{}:{}:{}'.format(
+        user.pk, export_class.format, get_cart_fingerprint(user)
+    )
+    document = cache.get(key)
+    record_cache('shopping_cart', document is not None)
+    if document is not None:
+        return (
+            document[start:start + CHUNK_SIZE]
+            for start in range(0, len(document), CHUNK_SIZE)
+        )
+    return _render_and_cache(export_class(get_cart_ingredients(user)), key)
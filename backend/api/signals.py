@@ -0,0 +1,43 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from recipes.models import (IngredientRecipe, Ingredients, Recipe, TagRecipe,
+                            Tags, User)
+
+from .search import in_memory_search
+from .versions import bump_version
+
+# Версии меняются после коммита, чтобы параллельный запрос не успел
+# закэшировать данные без еще не зафиксированных изменений под новой
+# версией
+
+
+@receiver(post_save, sender=Ingredients)
+@receiver(post_delete, sender=Ingredients)
+def invalidate_ingredient_index(**kwargs):
+    transaction.on_commit(in_memory_search.invalidate)
+
+
+@receiver(post_save, sender=Tags)
+@receiver(post_delete, sender=Tags)
+def bump_tags_version(**kwargs):
+    transaction.on_commit(lambda: bump_version('tags'))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_users_version(update_fields=None, **kwargs):
+    # Вход пользователя обновляет только last_login, которого нет в API
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    transaction.on_commit(lambda: bump_version('users'))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=TagRecipe)
+@receiver(post_delete, sender=TagRecipe)
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+def bump_recipes_version(**kwargs):
+    transaction.on_commit(lambda: bump_version('recipes'))
@@ -0,0 +1,79 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.cache import cache
+from django.test import override_settings
+from PIL import Image
+from recipes.models import (IngredientRecipe, Ingredients, Recipe, TagRecipe,
+                            Tags)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_data_uri(color='red'):
+    buffer = BytesIO()
+    Image.new('RGB', (20, 10), color).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+@override_settings(
+    CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }},
+    MEDIA_ROOT=MEDIA_ROOT,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class ApiTestCase(APITestCase):
+    """Тесты API с отдельным кэшем и каталогом медиа"""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.anon = APIClient()
+
+    def create_user(self, username='user'):
+        return User.objects.create_user(
+            username=username, email=f'{username}@example.com',
+            password='Pwd12345!xx', first_name='Имя', last_name='Фамилия',
+        )
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION='Token ' + Token.objects.get_or_create(
+                user=user
+            )[0].key
+        )
+        return client
+
+    def create_recipe(self, author, name='Рецепт', tags=(), ingredients=()):
+        recipe = Recipe.objects.create(
+            author=author, name=name, text='Описание', cooking_time=10,
+            image='recipes/test.png',
+        )
+        TagRecipe.objects.bulk_create(
+            TagRecipe(recipe=recipe, tag=tag) for tag in tags
+        )
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe=recipe, ingredients=ingredient,
+                             amount=amount)
+            for ingredient, amount in ingredients
+        )
+        return recipe
+
+    def create_tag(self, slug):
+        return Tags.objects.create(name=slug, slug=slug, color='#E26C2D')
+
+    def create_ingredient(self, name, unit='г'):
+        return Ingredients.objects.create(name=name, measurement_unit=unit)
@@ -0,0 +1,89 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from recipes.models import FavoriteRecipe, Recipe
+from users.models import Follow, User
+
+from .base import ApiTestCase
+
+
+class BulkRelationTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.client = self.client_for(self.user)
+        self.author = self.create_user('author')
+        self.recipes = [
+            self.create_recipe(self.author, name=f'Рецепт {i}')
+            for i in range(3)
+        ]
+        self.ids = [recipe.pk for recipe in self.recipes]
+
+    def favorites_counts(self):
+        return list(Recipe.objects.filter(pk__in=self.ids).order_by(
+            'pk'
+        ).values_list('favorites_count', flat=True))
+
+    def test_favorites_counters(self):
+        FavoriteRecipe.objects.create(
+            user=self.author, recipe=self.recipes[0]
+        )
+        response = self.client.post(
+            '/api/recipes/favorite/', {'ids': self.ids}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.favorites_counts(), [2, 1, 1])
+
+        missing = max(self.ids) + 1
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(
+                '/api/recipes/favorite/', {'ids': self.ids[:2] + [missing]},
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['results'], [
+            {'id': self.ids[0], 'status': 'deleted'},
+            {'id': self.ids[1], 'status': 'deleted'},
+            {'id': missing, 'status': 'not_found'},
+        ])
+        self.assertEqual(self.favorites_counts(), [1, 0, 1])
+        # Один DELETE связей и один UPDATE счетчиков на весь пакет
+        statements = [
+            query['sql'].split()[0] for query in queries
+            if 'recipes_recipe' in query['sql']
+            or 'favoriterecipe' in query['sql']
+        ]
+        self.assertEqual(statements.count('DELETE'), 1)
+        self.assertEqual(statements.count('UPDATE'), 1)
+
+    def test_subscriptions_counters(self):
+        url = '/api/users/subscribe/'
+        ids = [self.author.pk, self.user.pk]
+        response = self.client.post(url, {'ids': ids}, format='json')
+        self.assertEqual(response.data['results'], [
+            {'id': self.author.pk, 'status': 'created'},
+            {'id': self.user.pk, 'status': 'forbidden'},
+        ])
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 1)
+
+        self.client.delete(url, {'ids': ids}, format='json')
+        self.assertFalse(Follow.objects.filter(user=self.user).exists())
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).followers_count, 0
+        )
+
+    def test_actions_routed(self):
+        for url in ('/api/recipes/favorite/', '/api/recipes/shopping_cart/',
+                    '/api/users/subscribe/'):
+            with self.subTest(url=url):
+                self.assertEqual(resolve(url).func.actions, {
+                    'post': 'create', 'delete': 'destroy',
+                })
+                response = self.client.options(url)
+                allowed = {
+                    method.strip()
+                    for method in response['Allow'].split(',')
+                }
+                self.assertTrue({'POST', 'DELETE'} <= allowed, allowed)
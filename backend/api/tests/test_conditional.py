@@ -0,0 +1,49 @@
+import base64
+import io
+from contextlib import redirect_stdout
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from recipes.models import Recipe
+
+from .base import ApiTestCase, image_data_uri
+
+
+class RecipeConditionalGetTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.recipe = self.create_recipe(self.user)
+
+    def test_invalid_pk_returns_404(self):
+        for client in (self.anon, self.client_for(self.user)):
+            response = client.get('/api/recipes/abc/')
+            self.assertEqual(response.status_code, 404)
+
+    def test_missing_recipe_returns_404(self):
+        response = self.anon.get(f'/api/recipes/{self.recipe.pk + 1}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_etag_returns_304(self):
+        url = f'/api/recipes/{self.recipe.pk}/'
+        response = self.anon.get(url)
+        self.assertEqual(response.status_code, 200)
+        response = self.anon.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_processed_images_change_etag(self):
+        data = image_data_uri('green').split(',', 1)[1]
+        name = default_storage.save(
+            'recipes/old.png', ContentFile(base64.b64decode(data))
+        )
+        Recipe.objects.filter(pk=self.recipe.pk).update(image=name)
+        url = f'/api/recipes/{self.recipe.pk}/'
+        etag = self.anon.get(url)['ETag']
+
+        with redirect_stdout(io.StringIO()):
+            call_command('process_recipe_images')
+        response = self.anon.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('thumbnail', response.data['image_variants'])
@@ -0,0 +1,49 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Recipe
+from users.models import User
+
+from .base import ApiTestCase
+
+
+class RecipesCountTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.first = self.create_user('first')
+        self.second = self.create_user('second')
+        self.recipe = self.create_recipe(self.first)
+
+    def recipes_counts(self):
+        return [
+            User.objects.get(pk=user.pk).recipes_count
+            for user in (self.first, self.second)
+        ]
+
+    def test_author_change_moves_recipe(self):
+        self.assertEqual(self.recipes_counts(), [1, 0])
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        recipe.author = self.second
+        recipe.save()
+        self.assertEqual(self.recipes_counts(), [0, 1])
+        # Повторное сохранение не меняет счетчики
+        recipe.save()
+        self.assertEqual(self.recipes_counts(), [0, 1])
+
+    def test_author_change_on_unloaded_instance(self):
+        self.recipe.author = self.second
+        self.recipe.save()
+        self.assertEqual(self.recipes_counts(), [0, 1])
+
+    def test_save_without_author_change(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        recipe.name = 'Новое название'
+        with CaptureQueriesContext(connection) as queries:
+            recipe.save()
+        # Прежний автор известен с загрузки: без SELECT и UPDATE
+        # счетчиков
+        self.assertEqual([
+            query['sql'].split()[0] for query in queries
+            if query['sql'].startswith(('SELECT', 'UPDATE'))
+        ], ['UPDATE'])
+        self.assertEqual(self.recipes_counts(), [1, 0])
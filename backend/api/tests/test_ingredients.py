@@ -0,0 +1,52 @@
+from api.search import in_memory_search
+from django.test import override_settings
+from recipes.models import Ingredients
+
+from .base import ApiTestCase
+
+
+@override_settings(INGREDIENT_SEARCH_IN_MEMORY=True)
+class IngredientSearchTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.salt = self.create_ingredient('Соль')
+        self.sea_salt = self.create_ingredient('соль морская')
+        self.salted = self.create_ingredient('фасоль')
+        self.salt_kg = self.create_ingredient('соль', 'кг')
+        self.create_ingredient('сахар')
+
+    def test_prefix_matches_first(self):
+        response = self.anon.get('/api/ingredients/?name=сол')
+        self.assertEqual(response.status_code, 200)
+        names = [item['name'] for item in response.data]
+        self.assertEqual(len(names), 4)
+        self.assertEqual(names[-1], 'фасоль')
+
+    def test_search_respects_queryset(self):
+        queryset = in_memory_search.search(
+            Ingredients.objects.filter(measurement_unit='г'), 'сол'
+        )
+        self.assertEqual(
+            list(queryset),
+            [self.salt, self.sea_salt, self.salted],
+        )
+
+    def test_no_matches(self):
+        response = self.anon.get('/api/ingredients/?name=xyz')
+        self.assertEqual(response.data, [])
+
+    @override_settings(INGREDIENT_SEARCH_MAX_RESULTS=2)
+    def test_results_limited(self):
+        response = self.anon.get('/api/ingredients/?name=сол')
+        self.assertEqual(len(response.data), 2)
+
+    def test_detail_ignores_search(self):
+        response = self.anon.get(
+            f'/api/ingredients/{self.salt.pk}/?name=сол'
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.anon.get(
+            f'/api/ingredients/{self.salt.pk}/?name=xyz'
+        )
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,90 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+
+from django.core.management import call_command
+from recipes.models import Ingredients, Tags
+
+from .base import ApiTestCase
+
+
+class LoadDataTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, records):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(records, file, ensure_ascii=False)
+        return path
+
+    def load(self, ingredients=None, tags=None):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            call_command(
+                'load_data',
+                ingredients=self.write('ingredients.json', ingredients)
+                if ingredients is not None else '',
+                tags=self.write('tags.json', tags)
+                if tags is not None else '',
+            )
+        return output.getvalue()
+
+    def test_repeated_load_is_idempotent(self):
+        ingredients = [
+            {'name': 'соль', 'measurement_unit': 'г'},
+            {'name': 'молоко', 'measurement_unit': 'мл'},
+        ]
+        self.assertIn('Добавлено: 2, обновлено: 0', self.load(ingredients))
+        output = self.load(ingredients)
+        self.assertIn(
+            'Добавлено: 0, обновлено: 0, без изменений: 2, пропущено: 0',
+            output,
+        )
+        self.assertEqual(Ingredients.objects.count(), 2)
+
+    def test_changed_rows_updated(self):
+        self.load(tags=[
+            {'name': 'Завтрак', 'color': '#E26C2D', 'slug': 'breakfast'},
+        ])
+        output = self.load(tags=[
+            {'name': 'Завтраки', 'color': '#49B64E', 'slug': 'breakfast'},
+        ])
+        self.assertIn('Добавлено: 0, обновлено: 1', output)
+        tag = Tags.objects.get()
+        self.assertEqual(
+            (tag.name, tag.color), ('Завтраки', '#49B64E')
+        )
+
+    def test_bad_rows_skipped(self):
+        Tags.objects.create(name='Обед', color='#E26C2D', slug='lunch')
+        output = self.load(
+            ingredients=[
+                {'name': ' ', 'measurement_unit': 'г'},
+                {'name': 'соль', 'measurement_unit': 'г'},
+            ],
+            tags=[
+                # Название занято тегом с другим slug
+                {'name': 'Обед', 'color': '#49B64E', 'slug': 'dinner'},
+                {'name': 'Ужин', 'color': '#8775D2', 'slug': 'supper'},
+            ],
+        )
+        self.assertIn(
+            'Добавлено: 1, обновлено: 0, без изменений: 0, пропущено: 1',
+            output,
+        )
+        self.assertEqual(output.count('пропущено: 1'), 2)
+        self.assertEqual(
+            list(Ingredients.objects.values_list('name', flat=True)),
+            ['соль'],
+        )
+        self.assertEqual(
+            set(Tags.objects.values_list('slug', flat=True)),
+            {'lunch', 'supper'},
+        )
@@ -0,0 +1,46 @@
+from unittest import mock
+
+from django.db import connections
+from django.test import override_settings
+from recipes.models import Recipe
+
+from ..pagination import get_count
+from .base import ApiTestCase
+
+
+@override_settings(PAGINATION_EXACT_COUNT_THRESHOLD=5)
+class ApproximateCountTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user()
+
+    def count_with_estimate(self, estimate):
+        queryset = Recipe.objects.all()
+        with mock.patch.object(
+            connections[queryset.db], 'vendor', 'postgresql'
+        ), mock.patch(
+            'api.pagination.estimate_count', return_value=estimate
+        ):
+            return get_count(queryset)
+
+    def create_recipes(self, number):
+        for i in range(number):
+            self.create_recipe(self.author, name=f'Рецепт {i}')
+
+    def test_overestimate_replaced_by_exact_count(self):
+        self.create_recipes(3)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.count_with_estimate(1000), 3)
+
+    def test_estimate_used_above_threshold(self):
+        self.create_recipes(5)
+        self.assertEqual(self.count_with_estimate(1000), 1000)
+        # Подтвержденная оценка берется из кэша
+        self.create_recipes(1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.count_with_estimate(1000), 1000)
+
+    def test_small_estimate_counted_exactly(self):
+        self.create_recipes(6)
+        self.assertEqual(self.count_with_estimate(2), 6)
@@ -0,0 +1,66 @@
+import os
+
+from recipes.models import Recipe
+
+from .base import MEDIA_ROOT, ApiTestCase, image_data_uri
+
+
+class RecipeCreateTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.client = self.client_for(self.user)
+        self.tag = self.create_tag('breakfast')
+        self.ingredient = self.create_ingredient('соль')
+
+    def payload(self, **fields):
+        return {
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': image_data_uri(),
+            'tags': [self.tag.pk],
+            'ingredients': [{'id': self.ingredient.pk, 'amount': 5}],
+            **fields,
+        }
+
+    def stored_images(self):
+        directory = os.path.join(MEDIA_ROOT, 'recipes')
+        if not os.path.isdir(directory):
+            return set()
+        return set(os.listdir(directory))
+
+    def test_create(self):
+        response = self.client.post(
+            '/api/recipes/', self.payload(), format='json'
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        recipe = Recipe.objects.get()
+        self.assertIn(os.path.basename(recipe.image.name),
+                      self.stored_images())
+
+    def test_create_with_image_url(self):
+        response = self.client.post('/api/recipes/', self.payload(
+            image='http://testserver/media/recipes/test.png'
+        ), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.data)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_invalid_recipe_stores_no_images(self):
+        images = self.stored_images()
+        response = self.client.post('/api/recipes/', self.payload(
+            image=image_data_uri('blue'), cooking_time=0,
+        ), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stored_images(), images)
+
+    def test_update_with_image_url_keeps_image(self):
+        recipe = self.create_recipe(self.user)
+        response = self.client.patch(f'/api/recipes/{recipe.pk}/', {
+            'image': 'http://testserver/media/recipes/test.png',
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image.name, 'recipes/test.png')
@@ -0,0 +1,47 @@
+from django.utils import timezone
+from recipes.models import Recipe
+
+from .base import ApiTestCase
+
+
+class RecipeCursorPaginationTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        author = self.create_user()
+        for i in range(7):
+            self.create_recipe(author, name=f'Рецепт {i}')
+        # Одинаковая дата публикации: порядок задает только id
+        Recipe.objects.update(pub_date=timezone.now())
+        self.ids = list(Recipe.objects.order_by('-id').values_list(
+            'id', flat=True
+        ))
+
+    def walk(self, client):
+        ids = []
+        url = '/api/recipes/?cursor=&limit=2'
+        # Ограничение на случай зацикленных ссылок next
+        while url and len(ids) <= len(self.ids):
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def test_walk_without_duplicates_or_gaps(self):
+        client = self.client_for(self.create_user('reader'))
+        self.assertEqual(self.walk(client), self.ids)
+
+    def test_anonymous_cache_keyed_by_cursor(self):
+        # Повторный обход берет страницы из кэша, и курсор каждой
+        # страницы должен давать свою запись
+        self.assertEqual(self.walk(self.anon), self.ids)
+        self.assertEqual(self.walk(self.anon), self.ids)
+
+    def test_page_pagination_without_cursor(self):
+        response = self.anon.get('/api/recipes/?limit=2')
+        self.assertEqual(response.data['count'], 7)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            self.ids[:2],
+        )
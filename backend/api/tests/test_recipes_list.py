@@ -0,0 +1,115 @@
+from django.core.cache import cache
+from recipes.models import FavoriteRecipe, ShoppingCart
+from users.models import Follow
+
+from .base import ApiTestCase
+
+# Выборка рецептов, COUNT(*) пагинации и prefetch авторов, тегов и
+# ингредиентов; авторизованному пользователю - еще поиск токена
+ANONYMOUS_QUERIES = 5
+AUTHENTICATED_QUERIES = 6
+
+
+class RecipeListQueriesTests(ApiTestCase):
+    """Число запросов ленты не зависит от размера страницы"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        tags = [self.create_tag('breakfast'), self.create_tag('dinner')]
+        ingredients = [
+            self.create_ingredient(f'ингредиент {i}') for i in range(3)
+        ]
+        for i in range(10):
+            author = self.create_user(f'author{i}')
+            recipe = self.create_recipe(
+                author, f'Рецепт {i}', tags=tags,
+                ingredients=[(ingredient, 10) for ingredient in ingredients],
+            )
+            FavoriteRecipe.objects.create(user=self.user, recipe=recipe)
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+            Follow.objects.create(user=self.user, author=author)
+
+    def assert_list_queries(self, client, expected):
+        for limit in (2, 8):
+            cache.clear()
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(expected):
+                    response = client.get(f'/api/recipes/?limit={limit}')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_anonymous(self):
+        self.assert_list_queries(self.anon, ANONYMOUS_QUERIES)
+
+    def test_authenticated(self):
+        self.assert_list_queries(
+            self.client_for(self.user), AUTHENTICATED_QUERIES
+        )
+        response = self.client_for(self.user).get('/api/recipes/?limit=2')
+        recipe = response.data['results'][0]
+        self.assertTrue(recipe['is_favorited'])
+        self.assertTrue(recipe['is_in_shopping_cart'])
+        self.assertTrue(recipe['author']['is_subscribed'])
+
+
+class RecipeTagsFilterTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        author = self.create_user()
+        self.client = self.client_for(author)
+        self.breakfast = self.create_tag('breakfast')
+        dinner = self.create_tag('dinner')
+        self.create_tag('dessert')
+        self.both = self.create_recipe(
+            author, 'Оба тега', tags=[self.breakfast, dinner]
+        )
+        self.breakfast_only = self.create_recipe(
+            author, 'Завтрак', tags=[self.breakfast]
+        )
+        self.dinner_only = self.create_recipe(
+            author, 'Ужин', tags=[dinner]
+        )
+        self.create_recipe(author, 'Без тегов')
+
+    def filtered_ids(self, *slugs, client=None):
+        response = (client or self.client).get(
+            '/api/recipes/', {'tags': slugs, 'limit': 10}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_combined_tags(self):
+        # Рецепт с обоими тегами попадает в выдачу один раз;
+        # assertCountEqual учитывает повторы
+        ids = [self.dinner_only.pk, self.breakfast_only.pk, self.both.pk]
+        self.assertCountEqual(self.filtered_ids('breakfast', 'dinner'), ids)
+        self.assertCountEqual(
+            self.filtered_ids('breakfast', 'dinner', client=self.anon), ids
+        )
+
+    def test_unknown_slugs(self):
+        self.assertEqual(self.filtered_ids('unknown'), [])
+        self.assertEqual(self.filtered_ids('unknown', 'missing'), [])
+        self.assertEqual(self.filtered_ids('dessert'), [])
+        self.assertCountEqual(
+            self.filtered_ids('unknown', 'breakfast'),
+            [self.breakfast_only.pk, self.both.pk],
+        )
+
+    def test_slug_change_invalidates_tag_ids(self):
+        for client in (self.client, self.anon):
+            self.filtered_ids('breakfast', client=client)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.breakfast.slug = 'morning'
+            self.breakfast.save()
+        for client in (self.client, self.anon):
+            with self.subTest(anonymous=client is self.anon):
+                self.assertCountEqual(
+                    self.filtered_ids('morning', client=client),
+                    [self.breakfast_only.pk, self.both.pk],
+                )
+                self.assertEqual(
+                    self.filtered_ids('breakfast', client=client), []
+                )
@@ -0,0 +1,77 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Recipe
+
+from .base import ApiTestCase
+
+RELATION_TABLES = ('recipes_ingredientrecipe', 'recipes_tagrecipe')
+
+
+class RecipePartialUpdateTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.client = self.client_for(self.user)
+        self.tags = [self.create_tag('breakfast'), self.create_tag('dinner')]
+        self.ingredients = [
+            self.create_ingredient(f'ингредиент {i}') for i in range(3)
+        ]
+        self.recipe = self.create_recipe(
+            self.user, tags=self.tags,
+            ingredients=[(ingredient, 10) for ingredient in self.ingredients],
+        )
+        self.url = f'/api/recipes/{self.recipe.pk}/'
+
+    def relation_writes(self, queries):
+        return [
+            query['sql'] for query in queries
+            if query['sql'].startswith(('INSERT', 'DELETE', 'UPDATE'))
+            and any(table in query['sql'] for table in RELATION_TABLES)
+        ]
+
+    def test_name_only_patch(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                self.url, {'name': 'Новое название'}, format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.relation_writes(queries), [])
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Новое название')
+        self.assertEqual(self.recipe.text, 'Описание')
+        self.assertEqual(self.recipe.tags.count(), 2)
+        self.assertEqual(self.recipe.ingredients.count(), 3)
+
+    def test_patch_changes_only_diff(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, {
+                'tags': [tag.pk for tag in self.tags],
+                'ingredients': [
+                    {'id': ingredient.pk, 'amount': 10}
+                    for ingredient in self.ingredients
+                ],
+            }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.relation_writes(queries), [])
+
+    def test_empty_required_field_rejected(self):
+        response = self.client.patch(self.url, {'text': ''}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).text, 'Описание'
+        )
+
+    def test_missing_ingredients_listed(self):
+        missing = [self.ingredients[-1].pk + 1, self.ingredients[-1].pk + 2]
+        response = self.client.patch(self.url, {
+            'ingredients': [
+                {'id': pk, 'amount': 10}
+                for pk in [self.ingredients[0].pk] + missing
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['ingredients'], [
+            'Ингредиенты не найдены: {}, {}.'.format(*missing)
+        ])
+        self.assertEqual(self.recipe.ingredients.count(), 3)
@@ -0,0 +1,52 @@
+from recipes.models import Recipe
+
+from .base import ApiTestCase
+
+
+class AnonymousListCacheTests(ApiTestCase):
+    """Изменение модели делает закэшированный список устаревшим"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.tag = self.create_tag('breakfast')
+        self.recipe = self.create_recipe(self.user, tags=[self.tag])
+
+    def first_recipe(self):
+        response = self.anon.get('/api/recipes/?limit=6')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results'][0]
+
+    def test_recipe_update_invalidates_list(self):
+        self.assertEqual(self.first_recipe()['name'], 'Рецепт')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client_for(self.user).patch(
+                f'/api/recipes/{self.recipe.pk}/',
+                {'name': 'Новое название'}, format='json',
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.first_recipe()['name'], 'Новое название')
+
+    def test_new_recipe_invalidates_list(self):
+        self.first_recipe()
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = self.create_recipe(self.user, name='Второй рецепт')
+        self.assertEqual(self.first_recipe()['id'], recipe.pk)
+
+    def test_tag_update_invalidates_lists(self):
+        self.assertEqual(self.first_recipe()['tags'][0]['name'], 'breakfast')
+        self.assertEqual(self.anon.get('/api/tags/').data[0]['name'],
+                         'breakfast')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.name = 'Завтрак'
+            self.tag.save()
+        self.assertEqual(self.first_recipe()['tags'][0]['name'], 'Завтрак')
+        self.assertEqual(self.anon.get('/api/tags/').data[0]['name'],
+                         'Завтрак')
+
+    def test_cached_without_changes(self):
+        self.first_recipe()
+        Recipe.objects.filter(pk=self.recipe.pk).update(name='Без сигнала')
+        # update() не меняет версию, поэтому отдается закэшированный ответ
+        with self.assertNumQueries(0):
+            self.assertEqual(self.first_recipe()['name'], 'Рецепт')
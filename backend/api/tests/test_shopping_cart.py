@@ -0,0 +1,64 @@
+from django.test import override_settings
+from recipes.models import Ingredients, ShoppingCart
+
+from ..versions import bump_version
+
+from .base import ApiTestCase
+
+
+class ShoppingCartExportTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.client = self.client_for(self.user)
+        self.salt_g = salt_g = self.create_ingredient('соль', 'г')
+        salt_kg = self.create_ingredient('соль', 'кг')
+        eggs = self.create_ingredient('яйца', 'шт')
+        pinch = self.create_ingredient('перец', 'щепотка')
+        for ingredients in (
+            [(salt_g, 5), (eggs, 2), (pinch, 1)],
+            [(salt_kg, 2), (eggs, 3), (pinch, 2)],
+        ):
+            ShoppingCart.objects.create(
+                user=self.user,
+                recipe=self.create_recipe(self.user, ingredients=ingredients),
+            )
+
+    def export_lines(self):
+        response = self.client.get(
+            '/api/recipes/download_shopping_cart/?format=txt'
+        )
+        self.assertEqual(response.status_code, 200)
+        return b''.join(
+            response.streaming_content
+        ).decode().splitlines()[1:]
+
+    def test_units_not_converted_by_default(self):
+        self.assertEqual(self.export_lines(), [
+            '- перец - 3 щепотка',
+            '- соль - 5 г',
+            '- соль - 2 кг',
+            '- яйца - 5 шт',
+        ])
+
+    @override_settings(SHOPPING_CART_CONVERT_UNITS=True)
+    def test_mixed_units_converted(self):
+        self.assertEqual(self.export_lines(), [
+            '- перец - 3 щепотка',
+            '- соль - 2005 г',
+            '- яйца - 5 шт',
+        ])
+
+    def test_ingredient_rename_invalidates_export(self):
+        self.assertIn('- соль - 5 г', self.export_lines())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salt_g.name = 'морская соль'
+            self.salt_g.save()
+        self.assertIn('- морская соль - 5 г', self.export_lines())
+
+        # Массовое изменение без сигналов отмечается вручную, как в
+        # команде load_data
+        Ingredients.objects.filter(pk=self.salt_g.pk).update(name='соль')
+        bump_version('ingredients')
+        self.assertIn('- соль - 5 г', self.export_lines())
@@ -0,0 +1,32 @@
+from users.models import Follow
+
+from .base import ApiTestCase
+
+
+class SubscriptionsListTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.client = self.client_for(self.user)
+        author = self.create_user('author')
+        for i in range(3):
+            self.create_recipe(author, name=f'Рецепт {i}')
+        Follow.objects.create(user=self.user, author=author)
+
+    def recipes_number(self, recipes_limit):
+        response = self.client.get(
+            '/api/users/subscriptions/',
+            {'limit': 6, 'recipes_limit': recipes_limit},
+        )
+        self.assertEqual(response.status_code, 200)
+        return len(response.data['results'][0]['recipes'])
+
+    def test_recipes_limit(self):
+        self.assertEqual(self.recipes_number('2'), 2)
+        self.assertEqual(self.recipes_number('0'), 0)
+
+    def test_invalid_recipes_limit_ignored(self):
+        for recipes_limit in ('abc', '-1', ''):
+            with self.subTest(recipes_limit=recipes_limit):
+                self.assertEqual(self.recipes_number(recipes_limit), 3)
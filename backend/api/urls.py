@@ -1,10 +1,12 @@
 from django.urls import include, path  # , re_path
 from rest_framework.routers import DefaultRouter
 
-from .views import (ActivateUser, CustomUserViewSet,
-                    DownloadShoppingCartViewSet, FavoriteRecipesViewSet,
-                    IngredientsViewSet, RecipesViewSet, ShoppingCartViewSet,
-                    SubscriptionsViewSet, TagsViewSet)
+from .mixins import BULK_ACTIONS
+from .views import (ActivateUser, BulkFavoritesViewSet,
+                    BulkShoppingCartViewSet, BulkSubscriptionsViewSet,
+                    CustomUserViewSet, DownloadShoppingCartViewSet,
+                    FavoriteRecipesViewSet, IngredientsViewSet, RecipesViewSet,
+                    ShoppingCartViewSet, SubscriptionsViewSet, TagsViewSet)
 
 v1_router = DefaultRouter()
 v1_router.register('tags', TagsViewSet, basename='tags')
@@ -36,6 +38,23 @@ v1_router.register(
 v1_router.register('users', CustomUserViewSet, basename='users')
 
 urlpatterns = [
+    # Пакетные операции идут до маршрутов роутера, иначе путь попадет
+    # в карточку рецепта или пользователя
+    path(
+        'recipes/favorite/',
+        BulkFavoritesViewSet.as_view(BULK_ACTIONS),
+        name='bulk_favorites-list',
+    ),
+    path(
+        'recipes/shopping_cart/',
+        BulkShoppingCartViewSet.as_view(BULK_ACTIONS),
+        name='bulk_shopping_cart-list',
+    ),
+    path(
+        'users/subscribe/',
+        BulkSubscriptionsViewSet.as_view(BULK_ACTIONS),
+        name='bulk_subscribe-list',
+    ),
     path('', include(v1_router.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
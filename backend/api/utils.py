@@ -1,4 +1,50 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+from recipes.models import FavoriteRecipe, ShoppingCart
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import exception_handler
+from users.models import Follow
+
+
+def annotate_recipe_flags(queryset, user):
+    """Помечает рецепты флагами избранного и корзины пользователя"""
+    if user.is_anonymous:
+        return queryset
+    return queryset.annotate(
+        is_favorited=Exists(
+            FavoriteRecipe.objects.filter(user=user, recipe=OuterRef('pk'))
+        ),
+        is_in_shopping_cart=Exists(
+            ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+        ),
+    )
+
+
+def annotate_is_subscribed(queryset, user, author_field='pk'):
+    """Помечает пользователей флагом подписки текущего пользователя"""
+    if user.is_anonymous:
+        return queryset
+    return queryset.annotate(
+        is_subscribed=Exists(
+            Follow.objects.filter(user=user, author=OuterRef(author_field))
+        ),
+    )
+
+
+def get_recipes_limit(request):
+    """Число рецептов автора из ?recipes_limit=; None - без ограничения"""
+    limit = request.query_params.get('recipes_limit', '')
+    return int(limit) if limit.isdigit() else None
+
+
+def create_unique(model, error, **fields):
+    """Создает объект одним INSERT; нарушение ограничения уникальности
+    превращается в ошибку валидации error"""
+    try:
+        with transaction.atomic():
+            return model.objects.create(**fields)
+    except IntegrityError:
+        raise ValidationError(error)
 
 
 def custom_exception_handler(exc, context):
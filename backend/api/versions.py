@@ -0,0 +1,31 @@
+import time
+
+from django.core.cache import cache
+
+KEY_PREFIX = 'model_version'
+
+
+def _key(name):
+    return f'{KEY_PREFIX}:{name}'
+
+
+def _new_version():
+    # Версия - время изменения в микросекундах: годится и для ETag,
+    # и для Last-Modified
+    return time.time_ns() // 1000
+
+
+def get_versions(*names):
+    """Текущие версии моделей из кэша"""
+    keys = [_key(name) for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(name):
+    """Отмечает изменение модели"""
+    cache.set(_key(name), _new_version(), None)
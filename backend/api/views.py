@@ -1,32 +1,34 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+import hashlib
+
+from django.db.models import OuterRef, Prefetch, Subquery
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from recipes.models import (FavoriteRecipe, IngredientRecipe, Ingredients,
                             Recipe, ShoppingCart, Tags, User)
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from users.models import Follow
 
-from backend.settings import BASE_DIR
-
 from .filters import IngredientsFilter, RecipeFilter
-from .mixins import ReadOnlyUserViewSet
-from .pagination import CustomPaginator
+from .mixins import (BulkRelationMixin, CachedListMixin, ConditionalGetMixin,
+                     ReadOnlyUserViewSet)
+from .pagination import CustomPaginator, RecipeCursorPaginator
 from .permissions import IsOwnerOrReadOnly
-from .serializers import (CreateRecipesSerializer, CustomUserSerializer,
-                          DownloadShoppingCartSerializer,
+from .serializers import (BulkIdsSerializer, CreateRecipesSerializer,
+                          CustomUserSerializer, DownloadShoppingCartSerializer,
                           FavoriteRecipesViewSetSerializer,
                           IngredientsSerializer, RecipesNoAuthorSerializer,
                           RecipesSerializer, SubscribeSerializer,
                           SubscriptionsSerializer, TagsSerializer)
+from .shopping_cart import EXPORTS, stream_shopping_list
+from .utils import (annotate_is_subscribed, annotate_recipe_flags,
+                    create_unique, get_recipes_limit)
+from .versions import get_versions
 
 
 class ActivateUser(UserViewSet):
@@ -48,6 +50,11 @@ class CustomUserViewSet(UserViewSet):
     serializer_class = CustomUserSerializer
     permission_classes = (AllowAny,)
 
+    def get_queryset(self):
+        return annotate_is_subscribed(
+            super().get_queryset(), self.request.user
+        )
+
     @action(
         methods=['get', ],
         detail=False,
@@ -59,29 +66,118 @@ class CustomUserViewSet(UserViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class TagsViewSet(ReadOnlyUserViewSet):
+class TagsViewSet(ConditionalGetMixin, CachedListMixin, ReadOnlyUserViewSet):
     """Вьюсет модели тегов"""
     queryset = Tags.objects.all()
     serializer_class = TagsSerializer
+    version_models = ('tags',)
+    response_cache_models = ('tags',)
+    cache_control = {'public': True, 'no_cache': True}
 
 
-class IngredientsViewSet(ReadOnlyUserViewSet):
+class IngredientsViewSet(ConditionalGetMixin, CachedListMixin,
+                         ReadOnlyUserViewSet):
     """Вьюсет модели ингредиентов"""
     queryset = Ingredients.objects.all()
     serializer_class = IngredientsSerializer
     filter_backends = (DjangoFilterBackend, )
     filterset_class = IngredientsFilter
+    version_models = ('ingredients',)
+    response_cache_models = ('ingredients',)
+    response_cache_params = ('name',)
+    cache_control = {'public': True, 'no_cache': True}
+
+    def filter_queryset(self, queryset):
+        # Поиск по name относится только к списку: с ним страница
+        # ингредиента не должна отвечать 404
+        if self.action != 'list':
+            return queryset
+        return super().filter_queryset(queryset)
 
 
-class RecipesViewSet(viewsets.ModelViewSet):
+class RecipesViewSet(ConditionalGetMixin, CachedListMixin,
+                     viewsets.ModelViewSet):
     """Вьюсет модели рецептов"""
     permission_classes = (IsOwnerOrReadOnly,)
     pagination_class = CustomPaginator
-    queryset = Recipe.objects.all()
     ordering_fields = ('-pub_date',)
     filter_backends = (DjangoFilterBackend, )
     filterset_class = RecipeFilter
     http_method_names = ['get', 'post', 'patch', 'create', 'delete']
+    cache_control = {'private': True, 'no_cache': True}
+    vary_headers = ('Authorization',)
+    response_cache_models = ('recipes', 'tags', 'ingredients', 'users')
+    response_cache_params = ('tags', 'author', 'page', 'limit', 'cursor')
+
+    def get_pagination_class(self):
+        if 'cursor' in self.request.query_params:
+            return RecipeCursorPaginator
+        return self.pagination_class
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            pagination_class = self.get_pagination_class()
+            self._paginator = (
+                None if pagination_class is None else pagination_class()
+            )
+        return self._paginator
+
+    def get_conditional_state(self):
+        if self.action != 'retrieve':
+            return None
+
+        try:
+            queryset = Recipe.objects.filter(pk=self.kwargs['pk'])
+        except (TypeError, ValueError):
+            # Некорректный id: ответ 404 вернет обычный поиск объекта
+            return None
+        user = self.request.user
+        queryset = annotate_recipe_flags(queryset, user)
+        fields = ['updated_at']
+        if user.is_authenticated:
+            queryset = annotate_is_subscribed(queryset, user, 'author')
+            fields += ['is_favorited', 'is_in_shopping_cart', 'is_subscribed']
+        state = queryset.values_list(*fields).first()
+        if state is None:
+            return None
+
+        versions = get_versions('tags', 'ingredients', 'users')
+        etag = hashlib.md5(
+            repr((self.kwargs['pk'], state, versions)).encode()
+        ).hexdigest()
+        # Флаги пользователя не имеют времени изменения, поэтому
+        # Last-Modified отдается только анонимным пользователям
+        last_modified = None
+        if user.is_anonymous:
+            last_modified = max(
+                int(state[0].timestamp()), max(versions) // 10 ** 6
+            )
+        return etag, last_modified
+
+    def get_queryset(self):
+        if self.action in ['list', 'retrieve']:
+            user = self.request.user
+            return annotate_recipe_flags(
+                Recipe.objects.prefetch_related(
+                    Prefetch(
+                        'author',
+                        queryset=annotate_is_subscribed(
+                            User.objects.all(), user
+                        ),
+                    ),
+                    'tags',
+                    Prefetch(
+                        'ingredients',
+                        queryset=IngredientRecipe.objects.select_related(
+                            'ingredients'
+                        ),
+                    ),
+                ),
+                user,
+            )
+
+        return Recipe.objects.all()
 
     def get_serializer_class(self):
         if self.action in ['create', 'partial_update']:
@@ -150,28 +246,38 @@ class SubscriptionsViewSet(viewsets.ModelViewSet):
         return SubscriptionsSerializer
 
     def get_queryset(self):
-        return User.objects.filter(
-            follower__user__pk=self.request.user.pk,
+        recipes = Recipe.objects.all()
+        limit = get_recipes_limit(self.request)
+        if limit is not None:
+            recipes = recipes.filter(
+                pk__in=Subquery(
+                    Recipe.objects.filter(
+                        author=OuterRef('author')
+                    ).values('pk')[:limit]
+                )
+            )
+
+        return annotate_is_subscribed(
+            User.objects.filter(
+                follower__user__pk=self.request.user.pk,
+            ).prefetch_related(
+                Prefetch('recipes', queryset=recipes),
+            ),
+            self.request.user,
         )
 
     def create(self, request, *args, **kwargs):
         author = get_object_or_404(User, pk=kwargs['user_id'])
-        data = request.data.copy()
-        data['user'] = request.user
-        data['author'] = author
-        serializer = self.get_serializer(
-            author,
-            data=data
-        )
-        serializer.is_valid(raise_exception=True)
-        Follow.objects.create(
-            user=request.user,
-            author=author
+        if author == request.user:
+            raise ValidationError({'errors': 'Нельзя подписаться на себя'})
+        create_unique(
+            Follow, {'errors': 'Вы уже подписаны на этого автора'},
+            user=request.user, author=author,
         )
-        serializer.save()
+        author.is_subscribed = True
 
         return Response(
-            serializer.data,
+            self.get_serializer(author).data,
             status=status.HTTP_201_CREATED
         )
 
@@ -193,23 +299,12 @@ class ShoppingCartViewSet(viewsets.ModelViewSet):
 
     def create(self, request, *args, **kwargs):
         recipe = get_object_or_404(Recipe, pk=kwargs['recipes_id'])
-        data = request.data.copy()
-        data['recipe'] = recipe
-        data['user'] = request.user
-        data['name'] = recipe.name
-        data['image'] = recipe.image
-        serializer = self.get_serializer(
-            recipe,
-            data=data
+        create_unique(
+            ShoppingCart, {'errors': 'Рецепт уже в корзине'},
+            user=request.user, recipe=recipe,
         )
-        serializer.is_valid(raise_exception=True)
-        ShoppingCart.objects.create(
-            user=request.user,
-            recipe=recipe
-        )
-        serializer.save()
         return Response(
-            serializer.data,
+            self.get_serializer(recipe).data,
             status=status.HTTP_201_CREATED
         )
 
@@ -224,62 +319,58 @@ class ShoppingCartViewSet(viewsets.ModelViewSet):
                         status=status.HTTP_204_NO_CONTENT)
 
 
+class BulkFavoritesViewSet(BulkRelationMixin, viewsets.GenericViewSet):
+    """Вьюсет пакетного изменения избранного"""
+    serializer_class = BulkIdsSerializer
+    relation_model = FavoriteRecipe
+    target_model = Recipe
+    target_field = 'recipe'
+    counter_field = 'favorites_count'
+
+
+class BulkShoppingCartViewSet(BulkRelationMixin, viewsets.GenericViewSet):
+    """Вьюсет пакетного изменения корзины"""
+    serializer_class = BulkIdsSerializer
+    relation_model = ShoppingCart
+    target_model = Recipe
+    target_field = 'recipe'
+
+
+class BulkSubscriptionsViewSet(BulkRelationMixin, viewsets.GenericViewSet):
+    """Вьюсет пакетной подписки на авторов"""
+    serializer_class = BulkIdsSerializer
+    relation_model = Follow
+    target_model = User
+    target_field = 'author'
+    counter_field = 'followers_count'
+
+    def get_forbidden_ids(self, ids):
+        return {self.request.user.pk} & ids
+
+
 class DownloadShoppingCartViewSet(viewsets.ModelViewSet):
     """Вьюсет скачивания списка продуктов"""
     permission_classes = (IsAuthenticated,)
     serializer_class = DownloadShoppingCartSerializer
-    pdfmetrics.registerFont(TTFont('arial', BASE_DIR + '/fonts/arial.ttf'))
 
-    def list(self, request):
+    def perform_content_negotiation(self, request, force=False):
+        # ?format= выбирает формат выгрузки, а не рендерер DRF
+        return super().perform_content_negotiation(request, force=True)
 
-        filtered_ingredients = (
-            IngredientRecipe.objects
-            .filter(recipe__recipe_in_cart__user=request.user)
-            .values('ingredients')
-            .annotate(total_amount=Sum('amount'))
-            .values_list('ingredients__name', 'total_amount',
-                         'ingredients__measurement_unit')
-        )
-
-        ingredients_dict = {}
-        for ingredient, amount, unit in filtered_ingredients:
-            if ingredient in ingredients_dict:
-                ingredients_dict[ingredient]['amount'] += amount
-            else:
-                ingredients_dict[ingredient] = {
-                    'amount': amount,
-                    'unit': unit or ''
-                }
-
-        ingredients_list = [
-            {
-                'name': ingredient,
-                'amount': data['amount'],
-                'unit': data['unit']
-            }
-            for ingredient, data in ingredients_dict.items()
-        ]
-
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="cart.pdf"'
-        response['Content-Encoding'] = 'utf-8'
-        p = canvas.Canvas(response)
-        p.setFont('arial', 22)
-        p.drawString(100, 750, 'Список покупок:')
-
-        y = 700
-        for ingredient in ingredients_list:
-            y -= 30
-            p.drawString(
-                100,
-                y, (
-                    f"- {ingredient['name']}"
-                    f" - {ingredient['amount']}"
-                    f" {ingredient['unit']}"
-                ),
+    def list(self, request):
+        export_class = EXPORTS.get(request.query_params.get('format', 'pdf'))
+        if export_class is None:
+            return Response(
+                {'errors': 'Доступные форматы: {}'.format(', '.join(EXPORTS))},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
-        p.showPage()
-        p.save()
+        response = StreamingHttpResponse(
+            stream_shopping_list(request.user, export_class),
+            content_type=export_class.content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="cart.{export_class.format}"'
+        )
 
         return response
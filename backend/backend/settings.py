@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -40,6 +41,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.profiling.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -128,10 +131,97 @@ LOGIN_URL = 'recipes'
 
 LOGIN_REDIRECT_URL = 'recipes'
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
     }
+else:
+    # Общий для воркеров одного хоста кэш, когда Redis не настроен
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv(
+                'CACHE_LOCATION',
+                default=os.path.join(tempfile.gettempdir(), 'foodgram_cache')
+            ),
+        }
+    }
+
+RESPONSE_CACHE_TIMEOUT = 60 * 5
+
+PAGINATION_EXACT_COUNT_THRESHOLD = 1000
+
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+
+BULK_MAX_ITEMS = 100
+
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+
+IMAGE_PROCESSING_TIMEOUT = 30
+
+RECIPE_IMAGE_MAX_SIZE = 5 * 1024 * 1024
+
+RECIPE_IMAGE_MAX_PIXELS = 4096 * 4096
+
+IMAGE_SPOOL_MAX_MEMORY = 256 * 1024
+
+# Тело запроса с картинкой в base64 примерно на треть больше самой
+# картинки
+DATA_UPLOAD_MAX_MEMORY_SIZE = RECIPE_IMAGE_MAX_SIZE * 4 // 3 + 1024 * 1024
+
+RECIPE_IMAGE_THUMBNAIL_SIZE = (480, 480)
+
+RECIPE_IMAGE_WEBP_QUALITY = 80
+
+SHOPPING_CART_CACHE_TIMEOUT = 60 * 60
+
+# Приведение единиц в списке покупок меняет выгружаемые суммы, поэтому
+# включается явно
+SHOPPING_CART_CONVERT_UNITS = os.getenv(
+    'SHOPPING_CART_CONVERT_UNITS', default='False'
+) == 'True'
+
+SHOPPING_CART_UNIT_CONVERSIONS = {
+    'кг': ('г', 1000),
+    'л': ('мл', 1000),
+}
+
+PDF_PREWARM = os.getenv('PDF_PREWARM', default='False') == 'True'
+
+INGREDIENT_SEARCH_IN_MEMORY = os.getenv(
+    'INGREDIENT_SEARCH_IN_MEMORY', default='False'
+) == 'True'
+
+# Подсказкам при вводе не нужно больше, а порядок результатов поиска
+# в памяти передается в SQL выражением CASE с ветвью на каждый id
+INGREDIENT_SEARCH_MAX_RESULTS = 500
+
+REQUEST_PROFILING = os.getenv('REQUEST_PROFILING', default='False') == 'True'
+
+REQUEST_PROFILING_REPEAT_THRESHOLD = 5
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', default='False') == 'True'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
 }
 
 REST_FRAMEWORK = {
@@ -141,9 +231,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
-    'DEFAULT_PAGINATION_CLASS': [
-        'api.pagination.CustomPaginator',
-    ],
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.CustomPaginator',
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
@@ -35,7 +35,7 @@ class RecipesAdmin(admin.ModelAdmin):
 
     @admin.display(description='В избранном')
     def in_favorites(self, obj):
-        return obj.favorite_recipe.count()
+        return obj.favorites_count
 
 
 @admin.register(Ingredients)
@@ -101,6 +101,7 @@ class UserAdmin(admin.ModelAdmin):
 
     list_display = (
         'username', 'pk', 'email', 'password', 'first_name', 'last_name',
+        'recipes_count', 'followers_count',
     )
     list_editable = ('password', )
     list_filter = ('username', 'email')
@@ -0,0 +1,58 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+class CounterFieldsMixin:
+    """Сохранение модели не перезаписывает счетчики.
+
+    Счетчики меняются только UPDATE с F(), поэтому значения в
+    загруженном ранее объекте могут быть устаревшими.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not kwargs.get('force_insert')
+            and kwargs.get('update_fields') is None
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+def change_counter(model, pk, field, delta):
+    """Меняет счетчик одним UPDATE с F(), не опускаясь ниже нуля"""
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def count_subquery(model, field):
+    """Подзапрос числа строк model, ссылающихся на внешний объект"""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                count=Count('pk')
+            ).values('count'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def recount_counters(recipe_model, user_model, favorite_model, follow_model):
+    """Пересчитывает денормализованные счетчики одним UPDATE на таблицу"""
+    recipe_model.objects.update(
+        favorites_count=count_subquery(favorite_model, 'recipe'),
+    )
+    user_model.objects.update(
+        recipes_count=count_subquery(recipe_model, 'author'),
+        followers_count=count_subquery(follow_model, 'author'),
+    )
@@ -0,0 +1,170 @@
+import csv
+import itertools
+import json
+import re
+from collections import Counter
+
+from django.db import DataError, IntegrityError, transaction
+
+READ_SIZE = 64 * 1024
+# Запись JSON больше этого размера считается ошибкой, а не
+# недочитанным концом буфера
+MAX_RECORD_SIZE = 1024 * 1024
+SEPARATORS_RE = re.compile(r'[\s,]*')
+
+
+def read_json(file):
+    """Элементы JSON-массива из файла по одному.
+
+    Файл читается кусками по READ_SIZE, в памяти держится только
+    текущий кусок.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(READ_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('Ожидается JSON-массив')
+    position = 1
+    while True:
+        position = SEPARATORS_RE.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            end = None
+        # Значение в конце буфера могло быть прочитано не целиком
+        if end is None or end == len(buffer):
+            data = file.read(READ_SIZE)
+            if data and len(buffer) - position < MAX_RECORD_SIZE:
+                buffer = buffer[position:] + data
+                position = 0
+                continue
+            if end is None:
+                raise ValueError(
+                    'Некорректный JSON: {}'.format(
+                        buffer[position:position + 80]
+                        or 'неожиданный конец файла'
+                    )
+                )
+        yield item
+        position = end
+
+
+def read_csv(file):
+    """Строки CSV с заголовком как словари"""
+    return csv.DictReader(file)
+
+
+READERS = {
+    '.json': read_json,
+    '.csv': read_csv,
+}
+
+
+def read_records(path):
+    """Записи файла JSON или CSV по одной, формат - по расширению"""
+    for extension, reader in READERS.items():
+        if path.lower().endswith(extension):
+            break
+    else:
+        raise ValueError(f'Неизвестный формат файла: {path}')
+    with open(path, encoding='utf-8', newline='') as file:
+        yield from reader(file)
+
+
+def clean(record, fields):
+    """Значения полей записи без пробелов по краям, пустые - None"""
+    values = {}
+    for field in fields:
+        value = record.get(field)
+        if value is not None:
+            value = str(value).strip() or None
+        values[field] = value
+    return values
+
+
+def import_chunk(model, records, key_fields, fields, stats):
+    """Вставляет новые и обновляет измененные записи одной пачки"""
+    by_key = {}
+    for record in records:
+        values = clean(record, fields)
+        key = tuple(values[field] for field in key_fields)
+        if None in key:
+            stats['skipped'] += 1
+            continue
+        # Повтор ключа в пачке: побеждает последняя запись
+        stats['skipped'] += key in by_key
+        by_key[key] = values
+
+    existing = {
+        tuple(getattr(obj, field) for field in key_fields): obj
+        for obj in model.objects.filter(**{
+            f'{key_fields[0]}__in': {key[0] for key in by_key}
+        })
+    }
+    created = []
+    changed = []
+    update_fields = [field for field in fields if field not in key_fields]
+    for key, values in by_key.items():
+        obj = existing.get(key)
+        if obj is None:
+            created.append(model(**values))
+        elif any(getattr(obj, field) != values[field]
+                 for field in update_fields):
+            for field in update_fields:
+                setattr(obj, field, values[field])
+            changed.append(obj)
+        else:
+            stats['unchanged'] += 1
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(created)
+            if changed:
+                model.objects.bulk_update(changed, update_fields)
+    except (IntegrityError, DataError):
+        # В пачке есть строки, нарушающие ограничения базы: сохраняем
+        # по одной и пропускаем только их
+        for obj in created:
+            obj.pk = None
+        created = save_rows(created, stats, force_insert=True)
+        changed = save_rows(changed, stats, update_fields=update_fields)
+    stats['inserted'] += len(created)
+    stats['updated'] += len(changed)
+
+
+def save_rows(objects, stats, **options):
+    """Сохраняет объекты по одному, каждый в своей точке сохранения.
+
+    Возвращает сохраненные объекты; отклоненные базой учитываются
+    в stats['skipped'].
+    """
+    saved = []
+    for obj in objects:
+        try:
+            with transaction.atomic():
+                obj.save(**options)
+        except (IntegrityError, DataError):
+            stats['skipped'] += 1
+        else:
+            saved.append(obj)
+    return saved
+
+
+def import_records(model, records, key_fields, fields, chunk_size=5000):
+    """Идемпотентно загружает записи по естественному ключу.
+
+    Записи обрабатываются пачками по chunk_size: существующие строки
+    пачки выбираются одним запросом по первому полю ключа, новые
+    вставляются bulk_create, измененные обновляются bulk_update.
+    Повторный импорт того же файла ничего не меняет.
+    Возвращает Counter с числом inserted, updated, unchanged и skipped:
+    в skipped попадают записи без ключа, повторы ключа в пачке и
+    строки, которые база отклонила, например, по уникальности.
+    """
+    stats = Counter(inserted=0, updated=0, unchanged=0, skipped=0)
+    records = iter(records)
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            return stats
+        import_chunk(model, chunk, key_fields, fields, stats)
@@ -1,45 +1,56 @@
-import json
-
-from django.core.management import BaseCommand
+from api.search import in_memory_search
+from api.versions import bump_version
+from django.core.management import BaseCommand, CommandError
+from recipes.importer import import_records, read_records
 from recipes.models import Ingredients, Tags
 
+SOURCES = (
+    # (параметр, модель, естественный ключ, поля)
+    ('ingredients', Ingredients, ('name', 'measurement_unit'),
+     ('name', 'measurement_unit')),
+    ('tags', Tags, ('slug',), ('name', 'color', 'slug')),
+)
+
 
 class Command(BaseCommand):
-    def handle(self, *args, **options):
-        if Ingredients.objects.exists():
-            print("Ингредиенты уже импортированы")
-            return None
-        print("Загрузка ingredients.json")
-        with open(
-            "./data/ingredients.json",
-            "r", encoding="utf-8"
-        ) as json_data:
-            data = json.loads(json_data.read())
+    help = (
+        'Загружает ингредиенты и теги из JSON или CSV: добавляет новые '
+        'и обновляет измененные'
+    )
 
-            ingredients = [
-                Ingredients(
-                    name=item.get("name"),
-                    measurement_unit=item.get("measurement_unit"),
-                )
-                for item in data
-            ]
-            Ingredients.objects.bulk_create(ingredients)
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ingredients', default='./data/ingredients.json',
+            help='Файл ингредиентов, пустая строка - пропустить',
+        )
+        parser.add_argument(
+            '--tags', default='./data/tags.json',
+            help='Файл тегов, пустая строка - пропустить',
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000)
 
-        if Tags.objects.exists():
-            return print("Теги уже импортированы")
-        print("Загрузка tags.json")
-        with open(
-            "./data/tags.json",
-            "r", encoding="utf-8"
-        ) as json_data:
-            data = json.loads(json_data.read())
-            tags = [
-                Tags(
-                    name=item.get("name"),
-                    color=item.get("color"),
-                    slug=item.get("slug"),
+    def handle(self, *args, **options):
+        for name, model, key_fields, fields in SOURCES:
+            path = options[name]
+            if not path:
+                continue
+            print(f"Загрузка {path}")
+            try:
+                stats = import_records(
+                    model, read_records(path), key_fields, fields,
+                    chunk_size=options['chunk_size'],
                 )
-                for item in data
-            ]
-            Tags.objects.bulk_create(tags)
-            return "Данные успешно импортированы"
+            except (OSError, ValueError) as error:
+                raise CommandError(error)
+            print(
+                f"Добавлено: {stats['inserted']}, "
+                f"обновлено: {stats['updated']}, "
+                f"без изменений: {stats['unchanged']}, "
+                f"пропущено: {stats['skipped']}"
+            )
+            # bulk_create и bulk_update не отправляют сигналы
+            if stats['inserted'] or stats['updated']:
+                if model is Ingredients:
+                    in_memory_search.invalidate()
+                else:
+                    bump_version('tags')
@@ -0,0 +1,29 @@
+from api.images import ImageProcessingError, store_image
+from api.versions import bump_version
+from django.core.management import BaseCommand
+from django.utils import timezone
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создает превью и WebP-варианты для картинок старых рецептов'
+
+    def handle(self, *args, **options):
+        processed = 0
+        for recipe in Recipe.objects.filter(image_variants={}).iterator():
+            try:
+                with recipe.image.open('rb') as image_file:
+                    image, image_variants = store_image(image_file)
+            except (OSError, ImageProcessingError) as error:
+                print(f"Рецепт {recipe.pk}: {error}")
+                continue
+            # update() не меняет auto_now поля, а по updated_at
+            # строится ETag рецепта
+            Recipe.objects.filter(pk=recipe.pk).update(
+                image=image, image_variants=image_variants,
+                updated_at=timezone.now(),
+            )
+            processed += 1
+        if processed:
+            bump_version('recipes')
+        print(f"Обработано картинок: {processed}")
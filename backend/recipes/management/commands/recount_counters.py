@@ -0,0 +1,14 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from recipes.counters import recount_counters
+from recipes.models import FavoriteRecipe, Recipe
+from users.models import Follow, User
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики избранного, рецептов и подписчиков'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recount_counters(Recipe, User, FavoriteRecipe, Follow)
+        print("Счетчики пересчитаны")
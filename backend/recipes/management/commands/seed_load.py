@@ -0,0 +1,86 @@
+from api.search import in_memory_search
+from api.versions import bump_version
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from recipes.seed import seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу синтетическими данными для нагрузочного '
+        'тестирования'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--recipes', type=int, default=300000)
+        parser.add_argument(
+            '--follows', type=int, default=10,
+            help='Среднее число подписок пользователя',
+        )
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Среднее число рецептов в избранном',
+        )
+        parser.add_argument(
+            '--cart', type=int, default=5,
+            help='Среднее число рецептов в списке покупок',
+        )
+        parser.add_argument('--tags', type=int, default=6)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=6)
+        parser.add_argument('--tags-per-recipe', type=int, default=2)
+        parser.add_argument(
+            '--author-skew', type=float, default=1.0,
+            help='Показатель Ципфа для числа рецептов у авторов, 0 - '
+                 'равномерно',
+        )
+        parser.add_argument(
+            '--popularity-skew', type=float, default=1.0,
+            help='Показатель Ципфа для популярности авторов и рецептов '
+                 'в подписках, избранном и покупках',
+        )
+        parser.add_argument(
+            '--activity-skew', type=float, default=1.0,
+            help='Показатель Ципфа для числа подписок, избранного и '
+                 'покупок у пользователей',
+        )
+        parser.add_argument(
+            '--max-per-owner', type=int, default=2000,
+            help='Наибольшее число связей одного вида у пользователя',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--chunk-size', type=int, default=10000)
+        parser.add_argument(
+            '--copy', action='store_true',
+            help='Загружать строки командой COPY (только PostgreSQL)',
+        )
+
+    def handle(self, *args, **options):
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('COPY доступен только для PostgreSQL')
+        print("Генерация данных...")
+        user_ids = seed(
+            users=options['users'],
+            recipes=options['recipes'],
+            follows=options['follows'],
+            favorites=options['favorites'],
+            cart=options['cart'],
+            tags=options['tags'],
+            ingredients=options['ingredients'],
+            ingredients_per_recipe=options['ingredients_per_recipe'],
+            tags_per_recipe=options['tags_per_recipe'],
+            random_seed=options['seed'],
+            chunk_size=options['chunk_size'],
+            author_skew=options['author_skew'],
+            popularity_skew=options['popularity_skew'],
+            activity_skew=options['activity_skew'],
+            max_per_owner=options['max_per_owner'],
+            use_copy=options['copy'],
+        )
+        # bulk_create и COPY не отправляют сигналы, поэтому версии
+        # кэша и индекс поиска ингредиентов обновляются вручную
+        for name in ('tags', 'users', 'recipes'):
+            bump_version(name)
+        in_memory_search.invalidate()
+        print(f"Создано пользователей: {len(user_ids)}")
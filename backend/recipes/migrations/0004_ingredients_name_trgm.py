@@ -0,0 +1,36 @@
+# Generated by Django 3.2.5 on 2026-10-18 05:40
+
+from django.db import migrations
+
+CREATE_TRGM_INDEX = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm;',
+    'CREATE INDEX IF NOT EXISTS recipes_ingredients_name_trgm '
+    'ON recipes_ingredients USING gin (UPPER(name) gin_trgm_ops);',
+)
+
+DROP_TRGM_INDEX = (
+    'DROP INDEX IF EXISTS recipes_ingredients_name_trgm;',
+)
+
+
+def run_on_postgresql(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_postgresql(CREATE_TRGM_INDEX),
+            run_on_postgresql(DROP_TRGM_INDEX),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.5 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+from recipes.counters import recount_counters
+
+
+def fill_counters(apps, schema_editor):
+    recount_counters(
+        apps.get_model('recipes', 'Recipe'),
+        apps.get_model('users', 'User'),
+        apps.get_model('recipes', 'FavoriteRecipe'),
+        apps.get_model('users', 'Follow'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_counters'),
+        ('recipes', '0005_tagrecipe_tag_recipe_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.5 on 2026-10-18 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredients',
+            index=models.Index(fields=['name', 'measurement_unit'], name='ingredients_name_unit'),
+        ),
+    ]
@@ -1,8 +1,10 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, RegexValidator
-from django.db import models
+from django.db import models, transaction
 from colorfield.fields import ColorField
 
+from .counters import CounterFieldsMixin, change_counter
+
 User = get_user_model()
 
 
@@ -46,12 +48,19 @@ class Ingredients(models.Model):
         ordering = ['name']
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        # Поиск по естественному ключу при импорте
+        indexes = [
+            models.Index(
+                fields=['name', 'measurement_unit'],
+                name='ingredients_name_unit',
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
     """Инициализация модели Recipes."""
 
     author = models.ForeignKey(
@@ -71,6 +80,12 @@ class Recipe(models.Model):
         help_text='Загрузите картинку',
         blank=False,
     )
+    image_variants = models.JSONField(
+        'Варианты картинки',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     cooking_time = models.IntegerField(
         default=1,
         verbose_name='Время приготовления(мин.)',
@@ -101,6 +116,17 @@ class Recipe(models.Model):
         auto_now_add=True,
         db_index=True,
     )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False,
+    )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
+
+    counter_fields = ('favorites_count',)
 
     class Meta:
         ordering = ['-pub_date']
@@ -110,6 +136,35 @@ class Recipe(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Автор на момент загрузки, чтобы при смене автора перенести
+        # рецепт между счетчиками без лишнего запроса
+        instance._loaded_author_id = instance.__dict__.get('author_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Сохраняет рецепт; при смене автора переносит его из
+        recipes_count прежнего автора в счетчик нового"""
+        update_fields = kwargs.get('update_fields')
+        if self._state.adding or (
+            update_fields is not None and 'author' not in update_fields
+        ):
+            super().save(*args, **kwargs)
+            return
+        with transaction.atomic(using=kwargs.get('using')):
+            previous_author_id = getattr(self, '_loaded_author_id', None)
+            if previous_author_id is None:
+                previous_author_id = Recipe.objects.filter(
+                    pk=self.pk
+                ).values_list('author_id', flat=True).first()
+            super().save(*args, **kwargs)
+            if previous_author_id not in (None, self.author_id):
+                change_counter(User, previous_author_id, 'recipes_count', -1)
+                change_counter(User, self.author_id, 'recipes_count', 1)
+        self._loaded_author_id = self.author_id
+
 
 class TagRecipe(models.Model):
     """Инициализация модели TagReceipe."""
@@ -135,6 +190,12 @@ class TagRecipe(models.Model):
             name='unique_tagrecipe',
         ),
         ]
+        indexes = [
+            models.Index(
+                fields=['tag', 'recipe'],
+                name='tagrecipe_tag_recipe',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.tag} {self.recipe}'
@@ -0,0 +1,257 @@
+import itertools
+import random
+from io import StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, models, transaction
+from users.models import Follow
+
+from .counters import recount_counters
+from .models import (FavoriteRecipe, IngredientRecipe, Ingredients, Recipe,
+                     ShoppingCart, TagRecipe, Tags, User)
+
+SEED_PASSWORD = 'seed-password'
+SEED_IMAGE = 'recipes/seed.png'
+TAG_COLORS = ('#E26C2D', '#49B64E', '#8775D2', '#FFD700', '#00BFFF')
+# После стольких неудачных попыток набрать различные цели по сильно
+# перекошенным весам оставшиеся цели выбираются равномерно
+SKEWED_DRAW_ATTEMPTS = 10
+
+
+def bulk_create(model, objects, chunk_size):
+    """Создает объекты из итератора пачками по chunk_size"""
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= chunk_size:
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def copy_value(value):
+    """Значение в текстовом формате COPY"""
+    if value is None:
+        return '\\N'
+    return str(value).translate({
+        ord('\\'): '\\\\', ord('\t'): '\\t', ord('\n'): '\\n',
+        ord('\r'): '\\r',
+    })
+
+
+def copy_create(model, objects, chunk_size):
+    """Загружает объекты из итератора командой COPY PostgreSQL.
+
+    Сигналы и проверки конфликтов не выполняются, поэтому объекты не
+    должны нарушать ограничения уникальности.
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not isinstance(field, models.AutoField)
+    ]
+    sql = 'COPY {} ({}) FROM STDIN'.format(
+        connection.ops.quote_name(model._meta.db_table),
+        ', '.join(connection.ops.quote_name(field.column) for field in fields),
+    )
+    objects = iter(objects)
+    with connection.cursor() as cursor:
+        while True:
+            batch = list(itertools.islice(objects, chunk_size))
+            if not batch:
+                break
+            buffer = StringIO()
+            for obj in batch:
+                buffer.write('\t'.join(
+                    copy_value(field.get_db_prep_save(
+                        field.pre_save(obj, True), connection
+                    ))
+                    for field in fields
+                ))
+                buffer.write('\n')
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+
+
+def ensure_reference_data(tags, ingredients, chunk_size):
+    """Теги и ингредиенты: существующие или сгенерированные"""
+    if not Tags.objects.exists():
+        Tags.objects.bulk_create(
+            Tags(name=f'Тег {i}', slug=f'tag{i}',
+                 color=TAG_COLORS[i % len(TAG_COLORS)])
+            for i in range(tags)
+        )
+    if not Ingredients.objects.exists():
+        bulk_create(Ingredients, (
+            Ingredients(name=f'ингредиент {i}', measurement_unit='г')
+            for i in range(ingredients)
+        ), chunk_size)
+    return (
+        list(Tags.objects.values_list('pk', flat=True)),
+        list(Ingredients.objects.values_list('pk', flat=True)),
+    )
+
+
+def zipf_weights(rng, size, skew):
+    """Веса по закону Ципфа 1 / rank ** skew в случайном порядке.
+
+    Популярность не связана с id: иначе самыми популярными всегда
+    оказывались бы первые созданные объекты.
+    """
+    ranks = list(range(1, size + 1))
+    rng.shuffle(ranks)
+    return [rank ** -skew for rank in ranks]
+
+
+def sampler(rng, population, skew=0):
+    """Функция выбора k случайных элементов population.
+
+    При skew = 0 выбор равномерный, иначе по закону Ципфа: чем больше
+    skew, тем сильнее выбор сосредоточен на немногих элементах.
+    """
+    if not skew:
+        return lambda k: [rng.choice(population) for _ in range(k)]
+    cum_weights = list(itertools.accumulate(
+        zipf_weights(rng, len(population), skew)
+    ))
+    return lambda k: rng.choices(population, cum_weights=cum_weights, k=k)
+
+
+def owner_counts(rng, owners, mean, skew=0, limit=None):
+    """Число связей для каждого владельца со средним mean.
+
+    При skew > 0 число распределено по закону Ципфа: немногие
+    владельцы получают большую часть связей. Дробная часть округляется
+    случайно, чтобы среднее сохранялось.
+    """
+    if not skew:
+        for owner in owners:
+            yield owner, mean if limit is None else min(mean, limit)
+        return
+    weights = zipf_weights(rng, len(owners), skew)
+    scale = mean * len(owners) / sum(weights)
+    for owner, weight in zip(owners, weights):
+        count = weight * scale
+        whole = int(count)
+        whole += rng.random() < count - whole
+        yield owner, whole if limit is None else min(whole, limit)
+
+
+def pairs(rng, owners, targets, per_owner, exclude_self=False,
+          popularity_skew=0, activity_skew=0, max_per_owner=None):
+    """Случайные различные пары (владелец, цель) для связей M2M.
+
+    popularity_skew задает перекос выбора целей (популярные авторы и
+    рецепты), activity_skew - перекос числа связей у владельцев
+    (пользователи с огромной корзиной).
+    """
+    draw = sampler(rng, targets, popularity_skew)
+    limit = len(targets) - exclude_self
+    if max_per_owner is not None:
+        limit = min(limit, max_per_owner)
+    for owner, count in owner_counts(
+        rng, owners, per_owner, activity_skew, limit
+    ):
+        chosen = set()
+        attempts = 0
+        while len(chosen) < count:
+            if attempts < SKEWED_DRAW_ATTEMPTS:
+                batch = draw(count - len(chosen))
+            else:
+                batch = [rng.choice(targets)]
+            attempts += 1
+            chosen.update(batch)
+            if exclude_self:
+                chosen.discard(owner)
+        for target in chosen:
+            yield owner, target
+
+
+@transaction.atomic
+def seed(users=2000, recipes=5000, follows=10, favorites=10, cart=5,
+         tags=6, ingredients=2000, ingredients_per_recipe=6,
+         tags_per_recipe=2, random_seed=0, chunk_size=5000,
+         author_skew=0, popularity_skew=0, activity_skew=0,
+         max_per_owner=None, use_copy=False):
+    """Наполняет базу синтетическими данными.
+
+    author_skew задает перекос числа рецептов у авторов,
+    popularity_skew - перекос подписок и избранного в пользу популярных
+    авторов и рецептов, activity_skew - перекос числа подписок,
+    избранного и покупок у пользователей; 0 - равномерно. С use_copy
+    строки загружаются командой COPY (только PostgreSQL).
+
+    При одинаковых параметрах на пустой базе данные одинаковы.
+    Возвращает id созданных пользователей.
+    """
+    rng = random.Random(random_seed)
+    create = copy_create if use_copy else bulk_create
+    tag_ids, ingredient_ids = ensure_reference_data(
+        tags, ingredients, chunk_size
+    )
+
+    # Хэш пароля считается один раз: PBKDF2 на каждого пользователя
+    # занял бы больше времени, чем все остальное
+    password = make_password(SEED_PASSWORD)
+    first_user = (User.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    ).first() or 0) + 1
+    create(User, (
+        User(username=f'seed{i}', email=f'seed{i}@example.com',
+             password=password, first_name='Seed', last_name=str(i))
+        for i in range(first_user, first_user + users)
+    ), chunk_size)
+    user_ids = list(User.objects.filter(
+        pk__gte=first_user
+    ).order_by('pk').values_list('pk', flat=True))
+
+    first_recipe = (Recipe.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    ).first() or 0) + 1
+    authors = sampler(rng, user_ids, author_skew)
+    create(Recipe, (
+        Recipe(author_id=author, name=f'Рецепт {i}',
+               text='Описание рецепта', cooking_time=rng.randint(5, 120),
+               image=SEED_IMAGE)
+        for i, author in zip(
+            range(first_recipe, first_recipe + recipes), authors(recipes)
+        )
+    ), chunk_size)
+    recipe_ids = list(Recipe.objects.filter(
+        pk__gte=first_recipe
+    ).order_by('pk').values_list('pk', flat=True))
+
+    create(IngredientRecipe, (
+        IngredientRecipe(recipe_id=recipe, ingredients_id=ingredient,
+                         amount=rng.randint(1, 500))
+        for recipe, ingredient in pairs(
+            rng, recipe_ids, ingredient_ids, ingredients_per_recipe
+        )
+    ), chunk_size)
+    create(TagRecipe, (
+        TagRecipe(recipe_id=recipe, tag_id=tag)
+        for recipe, tag in pairs(rng, recipe_ids, tag_ids, tags_per_recipe)
+    ), chunk_size)
+
+    skew = {
+        'popularity_skew': popularity_skew,
+        'activity_skew': activity_skew,
+        'max_per_owner': max_per_owner,
+    }
+    create(Follow, (
+        Follow(user_id=user, author_id=author)
+        for user, author in pairs(
+            rng, user_ids, user_ids, follows, exclude_self=True, **skew
+        )
+    ), chunk_size)
+    create(FavoriteRecipe, (
+        FavoriteRecipe(user_id=user, recipe_id=recipe)
+        for user, recipe in pairs(rng, user_ids, recipe_ids, favorites, **skew)
+    ), chunk_size)
+    create(ShoppingCart, (
+        ShoppingCart(user_id=user, recipe_id=recipe)
+        for user, recipe in pairs(rng, user_ids, recipe_ids, cart, **skew)
+    ), chunk_size)
+
+    recount_counters(Recipe, User, FavoriteRecipe, Follow)
+    return user_ids
@@ -0,0 +1,45 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from users.models import Follow, User
+
+from .counters import change_counter
+from .models import FavoriteRecipe, Recipe
+
+# Счетчики меняются одним UPDATE с F(), без чтения текущего значения,
+# поэтому параллельные запросы не теряют изменений. Смену автора
+# рецепта учитывает Recipe.save(). Массовые операции в обход сигналов
+# должны обновлять счетчики сами; расхождения исправляет команда
+# recount_counters.
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+def increment_favorites_count(instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+def decrement_favorites_count(instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(instance, **kwargs):
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def increment_followers_count(instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_followers_count(instance, **kwargs):
+    change_counter(User, instance.author_id, 'followers_count', -1)
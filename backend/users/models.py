@@ -1,8 +1,9 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from recipes.counters import CounterFieldsMixin
 
 
-class User(AbstractUser):
+class User(CounterFieldsMixin, AbstractUser):
 
     username = models.CharField(
         'Логин',
@@ -18,10 +19,24 @@ class User(AbstractUser):
         blank=False,
     )
 
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0,
+        editable=False,
+    )
+
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+        editable=False,
+    )
+
     USERNAME_FIELD = 'email'
     EMAIL_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
+    counter_fields = ('recipes_count', 'followers_count')
+
     class Meta:
         ordering = ['-username']
         verbose_name = 'Пользователь'